@@ -0,0 +1,202 @@
+"""
+Admission control for expensive routes.
+
+Every view belongs to a cost class.  Unmarked views are "light" (page
+renders, JSON reads) and are never held back.  Heavy views are marked
+with ``@cost("stitch")`` etc. (or listed in ``ADMISSION_ROUTES`` by
+endpoint, for blueprints that should not import this module) and must
+take a slot of their class before running:
+
+* each class has its own concurrency ``limit`` and a short wait ``queue``;
+* all heavy classes together may use at most ``ADMISSION_WORKER_SLOTS -
+  ADMISSION_RESERVED_LIGHT`` threads, counting queued requests (a waiter
+  holds a worker thread too), so light routes such as ``home()`` and
+  ``/projection`` always keep threads free;
+* a request that finds the queue full, or waits longer than ``timeout``,
+  gets ``503`` with ``Retry-After``.
+
+Work that is not a whole request (the GitHub refresh) uses
+``try_slot(name)`` and falls back to cached data when it is refused.
+Counters and gauges are exported through ``metrics``.
+
+Slots are per worker process; size ``ADMISSION_WORKER_SLOTS`` to the
+worker's thread count.
+
+Config keys (defaults set in ``init_app``)::
+
+    ADMISSION_ENABLED         True
+    ADMISSION_WORKER_SLOTS    4     concurrent requests a worker serves
+    ADMISSION_RESERVED_LIGHT  2     slots heavy classes may never take
+    ADMISSION_CLASSES         DEFAULT_CLASSES, overridable per key
+    ADMISSION_ROUTES          DEFAULT_ROUTES, endpoint -> class
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, jsonify, request
+
+import metrics
+
+# limit: concurrent; queue: waiters; timeout: max wait (s); retry_after: s
+DEFAULT_CLASSES = {
+    "stitch": {"limit": 1, "queue": 1, "timeout": 5.0, "retry_after": 30},
+    "upload": {"limit": 2, "queue": 4, "timeout": 2.0, "retry_after": 5},
+    "bulk": {"limit": 1, "queue": 2, "timeout": 5.0, "retry_after": 10},
+    "github": {"limit": 1, "queue": 0, "timeout": 0.0, "retry_after": 60},
+}
+DEFAULT_ROUTES = {
+    "logger.api_import": "bulk",
+    "logger.api_export": "bulk",
+}
+
+ADMITTED = metrics.registry.add(metrics.Counter(
+    "admission_admitted_total", "Heavy requests admitted, by cost class.", ("class",),
+))
+REJECTED = metrics.registry.add(metrics.Counter(
+    "admission_rejected_total", "Heavy requests turned away (503), by cost class "
+    "and reason (queue_full, timeout).", ("class", "reason"),
+))
+IN_FLIGHT = metrics.registry.add(metrics.Gauge(
+    "admission_in_flight", "Heavy requests currently running.", ("class",),
+))
+QUEUED = metrics.registry.add(metrics.Gauge(
+    "admission_queued", "Heavy requests waiting for a slot.", ("class",),
+))
+WAIT = metrics.registry.add(metrics.Histogram(
+    "admission_wait_seconds", "Time admitted requests spent queued.", ("class",),
+    (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+))
+
+
+def cost(name: str, methods=("POST",)):
+    """Mark a view as cost class *name* for the given HTTP methods."""
+    def decorate(view):
+        view.admission_class = (name, frozenset(methods))
+        return view
+    return decorate
+
+
+class Controller:
+    """Slot accounting for all heavy classes of one worker."""
+
+    def __init__(self, heavy_slots: int, classes: dict):
+        self.heavy_slots = max(heavy_slots, 0)
+        self.classes = classes
+        self._cond = threading.Condition()
+        self._running = {name: 0 for name in classes}
+        self._waiting = {name: 0 for name in classes}
+
+    def _free(self, name) -> bool:
+        return (self._running[name] < self.classes[name]["limit"]
+                and sum(self._running.values()) < self.heavy_slots)
+
+    def _threads(self) -> int:
+        """Worker threads held by heavy requests, running or queued."""
+        return sum(self._running.values()) + sum(self._waiting.values())
+
+    def acquire(self, name: str) -> str | None:
+        """Take a slot of class *name*; returns ``None`` when admitted or
+        the rejection reason."""
+        spec = self.classes[name]
+        start = time.perf_counter()
+        with self._cond:
+            if self._threads() >= self.heavy_slots:
+                REJECTED.inc(name, "queue_full")
+                return "queue_full"
+            if not self._free(name):
+                if self._waiting[name] >= spec["queue"]:
+                    REJECTED.inc(name, "queue_full")
+                    return "queue_full"
+                self._waiting[name] += 1
+                QUEUED.inc(name)
+                try:
+                    if not self._cond.wait_for(lambda: self._free(name), spec["timeout"]):
+                        REJECTED.inc(name, "timeout")
+                        return "timeout"
+                finally:
+                    self._waiting[name] -= 1
+                    QUEUED.dec(name)
+            self._running[name] += 1
+        IN_FLIGHT.inc(name)
+        ADMITTED.inc(name)
+        WAIT.observe(time.perf_counter() - start, name)
+        return None
+
+    def release(self, name: str):
+        with self._cond:
+            self._running[name] -= 1
+            self._cond.notify_all()
+        IN_FLIGHT.dec(name)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "heavy_slots": self.heavy_slots,
+                "running": dict(self._running),
+                "waiting": dict(self._waiting),
+            }
+
+
+def _controller():
+    return current_app.extensions.get("admission")
+
+
+@contextmanager
+def try_slot(name: str):
+    """``with try_slot("github") as admitted:`` – runs the body either way;
+    *admitted* says whether a slot was obtained (and is released after)."""
+    ctrl = _controller()
+    admitted = ctrl is None or ctrl.acquire(name) is None
+    try:
+        yield admitted
+    finally:
+        if admitted and ctrl is not None:
+            ctrl.release(name)
+
+
+def init_app(app):
+    app.config.setdefault("ADMISSION_ENABLED", True)
+    app.config.setdefault("ADMISSION_WORKER_SLOTS", 4)
+    app.config.setdefault("ADMISSION_RESERVED_LIGHT", 2)
+    app.config.setdefault("ADMISSION_CLASSES", {})
+    app.config.setdefault("ADMISSION_ROUTES", DEFAULT_ROUTES)
+    if not app.config["ADMISSION_ENABLED"]:
+        return
+    classes = {name: dict(spec) for name, spec in DEFAULT_CLASSES.items()}
+    for name, spec in app.config["ADMISSION_CLASSES"].items():
+        classes.setdefault(name, {}).update(spec)
+    ctrl = Controller(
+        int(app.config["ADMISSION_WORKER_SLOTS"]) - int(app.config["ADMISSION_RESERVED_LIGHT"]),
+        classes,
+    )
+    app.extensions["admission"] = ctrl
+    routes = dict(app.config["ADMISSION_ROUTES"])
+
+    @app.before_request
+    def _admit():
+        view = app.view_functions.get(request.endpoint)
+        name, methods = getattr(view, "admission_class", (None, ()))
+        if name is None:
+            name = routes.get(request.endpoint)
+        elif request.method not in methods:
+            name = None
+        if name is None:
+            return None
+        reason = ctrl.acquire(name)
+        if reason is not None:
+            resp = jsonify({"success": False, "error": "Server busy, please retry shortly."})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = str(int(classes[name]["retry_after"]))
+            return resp
+        g._admission_class = name
+        return None
+
+    @app.teardown_request
+    def _release(_exc):
+        # Teardown, not after_request: streamed responses hold their slot
+        # until the stream is finished.
+        name = g.pop("_admission_class", None)
+        if name is not None:
+            ctrl.release(name)
@@ -11,15 +11,19 @@ import urllib.request
 import urllib.error
 from datetime import datetime, timedelta
 
-from PIL import Image
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, current_app, render_template, request, redirect, url_for, jsonify
 from flask_compress import Compress
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_wtf.csrf import CSRFProtect
 from werkzeug.utils import secure_filename
 
+import admission
+import metrics
+import ratelimit  # noqa: F401 – registers the sqlite:// limiter storage
+from lazy import once
 from logger import init_app as init_logger, create_blueprint as logger_bp
+from logger.activity import week_grid
 
 # ── Logging ───────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -28,32 +32,52 @@ logging.basicConfig(
 )
 log = logging.getLogger(__name__)
 
-# ── App init ──────────────────────────────────────────────────────────
-app = Flask(__name__)
-app.config.from_object("config.Config")
-
 UPLOAD_FOLDER = "static/uploads"
 OUTPUT_FOLDER = "static/outputs"
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["OUTPUT_FOLDER"] = OUTPUT_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
-
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-
-# ── Extensions ────────────────────────────────────────────────────────
-Compress(app)
-csrf = CSRFProtect(app)
-limiter = Limiter(get_remote_address, app=app, default_limits=["120/minute"])
 
-init_logger(app)
-app.register_blueprint(logger_bp(), url_prefix="/logger")
+# ── Extensions (bound to the app in create_app) ───────────────────────
+csrf = CSRFProtect()
+limiter = Limiter(get_remote_address, default_limits=["120/minute"])
+
+
+# ── App factory ───────────────────────────────────────────────────────
+def create_app(config_object="config.Config"):
+    """Build the site.  Cheap by design: Pillow, project data, the logger
+    schema check and GitHub stats are all loaded on first use."""
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.config.setdefault("UPLOAD_FOLDER", UPLOAD_FOLDER)
+    app.config.setdefault("OUTPUT_FOLDER", OUTPUT_FOLDER)
+    app.config["MAX_CONTENT_LENGTH"] = 50 * 1024 * 1024  # 50 MB
+
+    metrics.init_app(app)  # before Compress, so sizes are measured compressed
+    Compress(app)
+    limiter.init_app(app)
+    if "metrics" in app.view_functions:
+        limiter.exempt(app.view_functions["metrics"])
+    admission.init_app(app)  # after the limiter: rate-limited requests take no slot
+    csrf.init_app(app)  # after admission: don't read bodies we will turn away
+
+    init_logger(app)
+    app.register_blueprint(logger_bp(), url_prefix="/logger")
+
+    # Prevent Flask-Login from redirecting portfolio routes to a login page.
+    app.login_manager.login_view = None
+    app.login_manager.unauthorized_handler(_handle_unauthorized)
+    app.after_request(_add_cache_headers)
+    _register_routes(app)
+    return app
+
+
+def __getattr__(name):
+    # ``app:app`` (gunicorn, flask) builds the default app on first access,
+    # so ``from app import create_app`` stays cheap.
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Prevent Flask-Login from redirecting portfolio routes to a login page.
-app.login_manager.login_view = None
 
-
-@app.login_manager.unauthorized_handler
 def _handle_unauthorized():
     if request.blueprint == "logger":
         return redirect(url_for("logger.login", next=request.url))
@@ -61,7 +85,6 @@ def _handle_unauthorized():
 
 
 # ── Static-asset cache headers ────────────────────────────────────────
-@app.after_request
 def _add_cache_headers(response):
     if request.path.startswith("/static/"):
         response.cache_control.max_age = 86400
@@ -85,16 +108,30 @@ def _is_allowed_image(file):
     return True
 
 
-# ── Cache projects.json at module level ───────────────────────────────
+# ── Lazily loaded resources ───────────────────────────────────────────
 _projects_path = os.path.join(os.path.dirname(__file__), "projects.json")
-with open(_projects_path, encoding="utf-8") as _f:
-    PROJECTS = json.load(_f)
-PROJECT_TAGS = sorted({tag for p in PROJECTS for tag in p["tags"]})
+
+
+@once
+def _projects():
+    """``(projects, sorted tags)`` from projects.json, read once per process."""
+    with open(_projects_path, encoding="utf-8") as f:
+        projects = json.load(f)
+    return projects, sorted({tag for p in projects for tag in p["tags"]})
+
+
+@once
+def _pil_image():
+    from PIL import Image  # pulls in NumPy when installed; keep off the boot path
+    return Image
 
 # ── GitHub stats (cached) ─────────────────────────────────────────────
 GITHUB_USERNAME = "lyrnoxx"
 _github_cache = {"data": None, "ts": 0}
 _GITHUB_TTL = 3600  # refresh every hour
+_EMPTY_GITHUB_STATS = {
+    "repos": 0, "contributions": 0, "lines": 0, "lines_fmt": "0", "heatmap": [],
+}
 
 
 def _fmt_number(n):
@@ -111,19 +148,29 @@ def _fetch_github_stats():
     now = time.time()
     if _github_cache["data"] and now - _github_cache["ts"] < _GITHUB_TTL:
         return _github_cache["data"]
+    # One refresh at a time; concurrent requests keep the cached copy.
+    with admission.try_slot("github") as admitted:
+        if admitted:
+            return _refresh_github_stats(now)
+    return _github_cache["data"] or _EMPTY_GITHUB_STATS
+
+
+def _refresh_github_stats(now):
     try:
         headers = {"User-Agent": "portfolio-app"}
         # ── Repos (for count + lines estimate) ────────────────────────
-        url = f"https://api.github.com/users/{GITHUB_USERNAME}/repos?per_page=100&type=owner"
+        api = current_app.config["GITHUB_API_URL"].rstrip("/")
+        url = f"{api}/users/{GITHUB_USERNAME}/repos?per_page=100&type=owner"
         req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as resp:
+        with metrics.timer("github_repos"), urllib.request.urlopen(req, timeout=10) as resp:
             repos = json.loads(resp.read().decode())
         total_repos = len(repos)
         total_lines = sum(r.get("size", 0) for r in repos) * 20
         # ── Real contribution calendar (scrape GitHub HTML) ───────────
-        contrib_url = f"https://github.com/users/{GITHUB_USERNAME}/contributions"
+        web = current_app.config["GITHUB_WEB_URL"].rstrip("/")
+        contrib_url = f"{web}/users/{GITHUB_USERNAME}/contributions"
         creq = urllib.request.Request(contrib_url, headers={"User-Agent": "portfolio-app"})
-        with urllib.request.urlopen(creq, timeout=10) as cresp:
+        with metrics.timer("github_contributions"), urllib.request.urlopen(creq, timeout=10) as cresp:
             html = cresp.read().decode()
         # Total contributions from heading
         m = re.search(r'([\d,]+)\s+contributions?\s+in the last year', html)
@@ -137,15 +184,10 @@ def _fetch_github_stats():
             days.append((match.group(1), int(match.group(2))))
         days.sort(key=lambda x: x[0])
         # Build heatmap grid (weeks of 7 days)
-        heatmap = []
-        week = []
-        for date_str, level in days:
-            week.append({"date": date_str, "count": level, "level": level})
-            if len(week) == 7:
-                heatmap.append(week)
-                week = []
-        if week:
-            heatmap.append(week)
+        heatmap = week_grid(
+            {"date": date_str, "count": level, "level": level}
+            for date_str, level in days
+        )
         stats = {
             "repos": total_repos,
             "contributions": contributions,
@@ -158,37 +200,37 @@ def _fetch_github_stats():
         return stats
     except Exception as exc:
         log.warning("GitHub stats fetch failed: %s", exc)
-        return _github_cache["data"] or {
-            "repos": 0, "contributions": 0, "lines": 0,
-            "lines_fmt": "0", "heatmap": [],
-        }
+        return _github_cache["data"] or _EMPTY_GITHUB_STATS
 
 # ── Routes ────────────────────────────────────────────────────────────
-@app.route("/")
 def home():
     return render_template("index.html", github_stats=_fetch_github_stats())
 
 
-@app.route("/reinforce")
 def reinforce():
     return render_template("project_reinforce.html")
 
 
-@app.route("/autoencoder", methods=["GET", "POST"])
+@admission.cost("upload")
 def autoencoder():
     if request.method == "POST":
         file = request.files.get("image")
         if not file or not _is_allowed_image(file):
             return render_template("project_autoencoder.html", error="Please upload a JPG or PNG image.")
 
+        upload_dir = current_app.config["UPLOAD_FOLDER"]
+        output_dir = current_app.config["OUTPUT_FOLDER"]
+        os.makedirs(upload_dir, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+
         filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1].lower()}"
-        filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+        filepath = os.path.join(upload_dir, filename)
         file.save(filepath)
 
-        image = Image.open(filepath).convert("L").resize((28, 28))
+        image = _pil_image().open(filepath).convert("L").resize((28, 28))
 
         output_filename = f"{uuid.uuid4()}.png"
-        output_path = os.path.join(app.config["OUTPUT_FOLDER"], output_filename)
+        output_path = os.path.join(output_dir, output_filename)
         image.save(output_path)
 
         return render_template(
@@ -199,12 +241,10 @@ def autoencoder():
     return render_template("project_autoencoder.html")
 
 
-@app.route("/drone")
 def drone():
     return render_template("project_drone.html")
 
 
-@app.route("/drone/system")
 def drone_system():
     return render_template("project_drone-system.html")
 
@@ -221,7 +261,7 @@ def cleanup_temp_dir(dir_path):
 def run_docker_command(temp_dir_path):
     temp_dir_path = os.path.normpath(os.path.abspath(temp_dir_path))
     command = [
-        "/usr/bin/docker",
+        current_app.config["DOCKER_BIN"],
         "run",
         "--rm",
         "-v",
@@ -237,9 +277,10 @@ def run_docker_command(temp_dir_path):
 
     try:
         log.info("Contents of %s: %s", temp_dir_path, os.listdir(temp_dir_path))
-        result = subprocess.run(
-            command, capture_output=True, text=True, check=True, timeout=180
-        )
+        with metrics.timer("docker_stitch"):
+            result = subprocess.run(
+                command, capture_output=True, text=True, check=True, timeout=180
+            )
         log.info("Docker STDOUT: %s", result.stdout)
         log.info("Docker STDERR: %s", result.stderr)
         return True, "Docker processing completed."
@@ -251,12 +292,12 @@ def run_docker_command(temp_dir_path):
         log.exception("Unexpected error running Docker")
         return False, "Internal error during processing."
 
-@app.route("/drone/stitch", methods=["GET", "POST"])
 @csrf.exempt  # this route uses fetch + JSON responses; CSRF via header instead
 @limiter.limit("10/minute")
+@admission.cost("stitch")
 def drone_stitch():
     if request.method == "POST":
-        base_temp = "/var/www/tmp"
+        base_temp = current_app.config["STITCH_TMP_DIR"]
         os.makedirs(base_temp, exist_ok=True)
         temp_dir = tempfile.mkdtemp(dir=base_temp)
         os.chmod(temp_dir, 0o755)
@@ -292,9 +333,9 @@ def drone_stitch():
 
             source_path = os.path.join(temp_dir, "output.png")
             final_map_filename = f"map_{uuid.uuid4()}.png"
-            destination_path = os.path.join(
-                app.config["OUTPUT_FOLDER"], final_map_filename
-            )
+            output_dir = current_app.config["OUTPUT_FOLDER"]
+            os.makedirs(output_dir, exist_ok=True)
+            destination_path = os.path.join(output_dir, final_map_filename)
 
             if os.path.exists(source_path):
                 shutil.move(source_path, destination_path)
@@ -341,34 +382,29 @@ def drone_stitch():
     return render_template("project_drone-stitch.html")
 
 
-@app.route("/drone/recent-works")
 def recentworks():
     return render_template("awd.html")
 
 
-@app.route("/talks")
 def talks():
     return render_template("project_talks.html")
 
 
-@app.route("/vision")
 def vision():
     return render_template("project_vision.html")
 
 
-@app.route("/graphics")
 def graphics():
     return render_template("graphics.html")
 
 
-@app.route("/projection")
 def projection():
+    projects, tags = _projects()
     return render_template(
-        "project_projection.html", projects=PROJECTS, all_tags=PROJECT_TAGS
+        "project_projection.html", projects=projects, all_tags=tags
     )
 
 
-@app.route("/nlp")
 def nlp():
     return render_template("project_nlp.html")
 
@@ -398,7 +434,6 @@ def _save_message(name, email, message):
         json.dump(msgs, f, indent=2, ensure_ascii=False)
 
 
-@app.route("/contact", methods=["GET", "POST"])
 @limiter.limit("5/minute")
 def contact():
     if request.method == "POST":
@@ -415,5 +450,21 @@ def contact():
     return render_template("contact.html")
 
 
+def _register_routes(app):
+    app.add_url_rule("/", view_func=home)
+    app.add_url_rule("/reinforce", view_func=reinforce)
+    app.add_url_rule("/autoencoder", view_func=autoencoder, methods=["GET", "POST"])
+    app.add_url_rule("/drone", view_func=drone)
+    app.add_url_rule("/drone/system", view_func=drone_system)
+    app.add_url_rule("/drone/stitch", view_func=drone_stitch, methods=["GET", "POST"])
+    app.add_url_rule("/drone/recent-works", view_func=recentworks)
+    app.add_url_rule("/talks", view_func=talks)
+    app.add_url_rule("/vision", view_func=vision)
+    app.add_url_rule("/graphics", view_func=graphics)
+    app.add_url_rule("/projection", view_func=projection)
+    app.add_url_rule("/nlp", view_func=nlp)
+    app.add_url_rule("/contact", view_func=contact, methods=["GET", "POST"])
+
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+Worker boot benchmark.
+
+Starts fresh interpreters that do what a gunicorn worker does – load
+``app:app`` – and times that, then the first request to a page and to the
+logger (which pays for whatever was deferred).  ``--importtime`` adds the
+slowest modules from ``python -X importtime``.
+
+Usage::
+
+    python bench/boot.py [--runs 5] [--importtime] [--root PATH]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+_PROBE = """
+import json, os, sys, time, warnings
+warnings.simplefilter("ignore")
+start = time.perf_counter()
+import app as site
+flask_app = site.app
+booted = time.perf_counter()
+client = flask_app.test_client()
+client.get("/projection")
+page = time.perf_counter()
+client.get("/logger/login")
+logger = time.perf_counter()
+print(json.dumps({
+    "boot": booted - start,
+    "first_page": page - booted,
+    "first_logger": logger - page,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def _env(db_path):
+    env = dict(os.environ)
+    env.update(SECRET_KEY="bench", DATABASE_URL=f"sqlite:///{db_path}",
+               PYTHONDONTWRITEBYTECODE="1")
+    return env
+
+
+def probe(root, db_path):
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=root, env=_env(db_path),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def importtime(root, db_path, top):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app; app.app"],
+        cwd=root, env=_env(db_path), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        head, _, name = line.rpartition("|")
+        self_us, cumulative_us = head.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--root", default=ROOT, help="checkout to measure")
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "boot.db")
+        probe(args.root, db_path)  # create the schema and warm the page cache
+        runs = [probe(args.root, db_path) for _ in range(args.runs)]
+
+        print(f"{args.runs} runs, {runs[0]['modules']} modules loaded at boot+first requests")
+        for key in ("boot", "first_page", "first_logger"):
+            values = sorted(r[key] * 1000 for r in runs)
+            print(f"{key:<13} median {statistics.median(values):7.1f}ms  "
+                  f"min {values[0]:7.1f}ms  max {values[-1]:7.1f}ms")
+
+        if args.importtime:
+            print("\nSlowest imports for app:app (cumulative, self) in ms:")
+            for cumulative, self_us, name in importtime(args.root, db_path, args.top):
+                print(f"{cumulative / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Shared helpers for the benchmark scripts."""
+
+import logging
+import os
+import sys
+import warnings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_app(db_path, env=None):
+    """Import the site against *db_path* with CSRF and rate limits off.
+
+    *env* is applied to ``os.environ`` first, for settings ``Config``
+    reads at import time.  Only one app per process.
+    """
+    logging.disable(logging.CRITICAL)  # errors are counted, not printed
+    warnings.simplefilter("ignore")
+    os.environ.update(env or {})
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SECRET_KEY", "bench")
+    os.chdir(ROOT)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app as site
+    from logger import ensure_schema
+
+    ensure_schema(site.app)
+    site.app.config["WTF_CSRF_ENABLED"] = False
+    site.limiter.enabled = False
+    return site.app
+
+
+def percentile(sorted_values, p):
+    """*p*-th percentile (0-1) of an ascending list, in milliseconds."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Stand-in for ``docker`` used by the benchmarks (``DOCKER_BIN``).
+
+Understands just the ``docker run ... -v HOST:/data ... Map.File2Save=...``
+call made by ``run_docker_command()``: it writes a small PNG where the
+container would have written the stitched map.  ``FAKE_DOCKER_DELAY``
+(seconds) simulates processing time.
+"""
+
+import os
+import struct
+import sys
+import time
+import zlib
+
+
+def _png(width=64, height=64):
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    raw = b"".join(b"\x00" + b"\x80" * width * 3 for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def main(argv):
+    if not argv or argv[0] != "run":
+        print(f"fake docker: unsupported command {argv[:1]}", file=sys.stderr)
+        return 1
+    volumes = {}
+    output = None
+    for i, arg in enumerate(argv):
+        if arg == "-v" and i + 1 < len(argv):
+            host, _, container = argv[i + 1].rpartition(":")
+            volumes[container] = host
+        elif arg.startswith("Map.File2Save="):
+            output = arg.split("=", 1)[1]
+    time.sleep(float(os.environ.get("FAKE_DOCKER_DELAY", "0")))
+    if output:
+        for container, host in volumes.items():
+            if output.startswith(container + "/"):
+                with open(os.path.join(host, output[len(container) + 1:]), "wb") as f:
+                    f.write(_png())
+    print("fake docker: done")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,130 @@
+"""
+Contention benchmark for the shared SQLite rate-limit storage.
+
+Several processes (each with a few threads) hammer the same limit keys
+through ``limits``' sliding-window-counter strategy, once per storage:
+
+* ``memory`` – Flask-Limiter's default; each process counts on its own
+* ``sqlite`` – ``ratelimit.SQLiteStorage``, shared by all processes
+
+Reports checks/s and per-check latency, and how many hits were allowed
+in total against the limit the keys should enforce.
+
+Usage::
+
+    python bench/ratelimit_contention.py [--workers 4] [--threads 4] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from bench.common import percentile  # noqa: E402
+
+STORAGES = ("memory", "sqlite")
+
+
+def _worker(uri, limit, keys, threads, seconds, barrier, results):
+    try:
+        import ratelimit  # noqa: F401 – registers sqlite://
+        from limits import parse
+        from limits.storage import storage_from_string
+        from limits.strategies import SlidingWindowCounterRateLimiter
+
+        limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+        item = parse(f"{limit}/hour")
+        latencies, allowed = [], [0]
+        lock = threading.Lock()
+        barrier.wait()
+        deadline = time.perf_counter() + seconds
+
+        def run(offset):
+            mine, ok, n = [], 0, offset
+            while time.perf_counter() < deadline:
+                n += 1
+                start = time.perf_counter()
+                ok += limiter.hit(item, f"key{n % keys}")
+                mine.append(time.perf_counter() - start)
+            with lock:
+                latencies.extend(mine)
+                allowed[0] += ok
+
+        pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        results.put((latencies, allowed[0]))
+    except BaseException:
+        import traceback
+        barrier.abort()
+        results.put(traceback.format_exc())
+
+
+def run_storage(storage, workers, threads, seconds, limit, keys):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = "memory://" if storage == "memory" else f"sqlite:///{tmp}/rl.db"
+        ctx = mp.get_context("spawn")
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_worker,
+                args=(uri, limit, keys, threads, seconds, barrier, results),
+            )
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        latencies, allowed = [], 0
+        for _ in procs:
+            result = results.get(timeout=seconds + 120)
+            if isinstance(result, str):
+                raise RuntimeError(f"benchmark worker failed:\n{result}")
+            lat, ok = result
+            latencies.extend(lat)
+            allowed += ok
+        for p in procs:
+            p.join()
+    latencies.sort()
+    return {
+        "storage": storage,
+        "checks_s": len(latencies) / seconds,
+        "p50_us": percentile(latencies, 0.50) * 1000,
+        "p99_us": percentile(latencies, 0.99) * 1000,
+        "allowed": allowed,
+        "expected": limit * keys,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--limit", type=int, default=100, help="hits per key per hour")
+    parser.add_argument("--keys", type=int, default=8, help="distinct limit keys")
+    parser.add_argument("--storages", default=",".join(STORAGES))
+    args = parser.parse_args(argv)
+
+    print(f"{args.workers} workers x {args.threads} threads, {args.seconds:g}s, "
+          f"{args.keys} keys at {args.limit}/hour")
+    header = f"{'storage':<8} {'checks/s':>9} {'p50':>9} {'p99':>9} {'allowed':>8} {'limit':>6}"
+    print(header)
+    print("-" * len(header))
+    for storage in args.storages.split(","):
+        r = run_storage(storage.strip(), args.workers, args.threads,
+                        args.seconds, args.limit, args.keys)
+        print(f"{r['storage']:<8} {r['checks_s']:>9.0f} {r['p50_us']:>7.0f}us "
+              f"{r['p99_us']:>7.0f}us {r['allowed']:>8d} {r['expected']:>6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Latency benchmark for the site's hot routes.
+
+Seeds a throwaway database with ``--users`` accounts (each with items, log
+entries and notes), points the GitHub client at a local stub server and
+``DOCKER_BIN`` at ``bench/fake_docker.py``, then drives every route with
+the Flask test client and reports p50/p95/p99 latency and throughput.
+
+Baselines are machine-specific: record one with ``--save-baseline`` on the
+machine you compare on.  Without it, results are checked against
+``bench/baseline.json`` and the run exits non-zero when a route's p95 got
+more than ``--threshold`` slower (and by at least ``--min-delta-ms``).
+Runs whose workload parameters differ from the baseline's are not
+compared (exit status 2).
+
+Usage::
+
+    python bench/routes.py [--iterations 200] [--routes home,api_items]
+    python bench/routes.py --save-baseline
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from bench.common import make_app, percentile  # noqa: E402
+from bench.fake_docker import _png  # noqa: E402
+
+BASELINE = os.path.join(ROOT, "bench", "baseline.json")
+PASSWORD = "bench"
+
+
+# ─────────────────────────────────────────────────────────
+#  External-service fakes
+# ─────────────────────────────────────────────────────────
+
+class _GitHubHandler(BaseHTTPRequestHandler):
+    """Serves the two GitHub URLs ``_fetch_github_stats()`` reads."""
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/repos"):
+            body = json.dumps(
+                [{"name": f"repo{i}", "size": 100 + i} for i in range(40)]
+            )
+            kind = "application/json"
+        elif path.endswith("/contributions"):
+            today = date.today()
+            cells = "".join(
+                f'<td data-date="{today - timedelta(days=d)}" id="c{d}" '
+                f'data-level="{d % 5}"></td>'
+                for d in range(371)
+            )
+            body = f"<h2>1,234 contributions in the last year</h2><table>{cells}</table>"
+            kind = "text/html"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_github_stub():
+    """Start the stub on an ephemeral port; returns ``(server, base_url)``."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GitHubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ─────────────────────────────────────────────────────────
+#  Seeding
+# ─────────────────────────────────────────────────────────
+
+def seed(app, users, items, logs, notes):
+    """Bulk-insert the fixture; returns the usernames."""
+    from sqlalchemy import insert
+
+    from logger import db
+    from logger.models import Item, LogEntry, Note, User
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    words = ("focus", "sleep", "run", "read", "ideas", "plan", "review",
+             "garden", "piano", "budget", "travel", "recipe")
+    password_hash = User.hash_password(PASSWORD)
+    names = [f"bench{u}" for u in range(users)]
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {"id": u + 1, "username": name, "password_hash": password_hash,
+             "created_at": now}
+            for u, name in enumerate(names)
+        ])
+        item_rows, log_rows, note_rows = [], [], []
+        for u in range(users):
+            for i in range(items):
+                item_id = len(item_rows) + 1
+                created = now - timedelta(days=rng.randint(30, 400))
+                item_rows.append({
+                    "id": item_id, "user_id": u + 1,
+                    "name": f"{rng.choice(words)} {i}", "description": "",
+                    "frequency": rng.choice((1.0, 2.0, 7.0)), "alpha": 1.0,
+                    "decay_rate": 0.05, "target": 100.0,
+                    "current_value": rng.uniform(0, 80), "streak": 0,
+                    "created_at": created,
+                    "updated_at": now - timedelta(hours=rng.randint(0, 72)),
+                })
+                for _ in range(logs):
+                    log_rows.append({
+                        "item_id": item_id, "amount": 1.0,
+                        "logged_at": now - timedelta(minutes=rng.randint(0, 525600)),
+                    })
+            for n in range(notes):
+                stamp = now - timedelta(minutes=rng.randint(0, 525600))
+                note_rows.append({
+                    "user_id": u + 1,
+                    "title": f"{rng.choice(words)} note {n}",
+                    "body": " ".join(rng.choice(words) for _ in range(40)),
+                    "color": "default", "pinned": n % 25 == 0,
+                    "created_at": stamp, "updated_at": stamp,
+                })
+        for model, rows in ((Item, item_rows), (LogEntry, log_rows), (Note, note_rows)):
+            for start in range(0, len(rows), 5000):
+                db.session.execute(insert(model), rows[start:start + 5000])
+        db.session.commit()
+    return names
+
+
+# ─────────────────────────────────────────────────────────
+#  Scenarios
+# ─────────────────────────────────────────────────────────
+
+def _stitch_files():
+    png = _png()
+    return {
+        "trajectory": (io.BytesIO(b"0 0 0 0 0 0 0 1\n" * 8), "trajectory.txt"),
+        "config": (io.BytesIO(b"DataPath=/data\n"), "config.cfg"),
+        "images": [(io.BytesIO(png), f"{i:04d}.png") for i in range(4)],
+    }
+
+
+def scenarios(site, ctx):
+    """``name -> (request, before)``; *request* takes the test client and
+    returns a response, *before* (optional) runs untimed first."""
+
+    def reset_github():
+        site._github_cache.update(data=None, ts=0)
+
+    item, note = ctx["item_id"], ctx["note_id"]
+    counter = iter(range(10**9))
+    return {
+        "home": (lambda c: c.get("/"), None),
+        "home_github_cold": (lambda c: c.get("/"), reset_github),
+        "projection": (lambda c: c.get("/projection"), None),
+        "logger_dashboard": (lambda c: c.get("/logger/"), None),
+        "logger_journal": (lambda c: c.get("/logger/journal"), None),
+        "api_items": (lambda c: c.get("/logger/api/items"), None),
+        "api_notes": (lambda c: c.get("/logger/api/notes?limit=100"), None),
+        "api_notes_delta": (
+            lambda c: c.get(f"/logger/api/notes?since={ctx['sync_token']}"), None
+        ),
+        "api_notes_search": (lambda c: c.get("/logger/api/notes/search?q=gard"), None),
+        "api_forecast": (lambda c: c.get("/logger/api/items/forecast"), None),
+        "api_activity": (lambda c: c.get("/logger/api/activity"), None),
+        "api_log": (lambda c: c.post(f"/logger/api/items/{item}/log", json={}), None),
+        "api_note_patch": (
+            lambda c: c.patch(
+                f"/logger/api/notes/{note}", json={"body": f"edit {next(counter)}"}
+            ),
+            None,
+        ),
+        "api_note_patch_noop": (
+            lambda c: c.patch(f"/logger/api/notes/{note}", json={"body": "edit 0"}),
+            None,
+        ),
+        "autoencoder": (
+            lambda c: c.post(
+                "/autoencoder",
+                data={"image": (io.BytesIO(ctx["png"]), "digit.png", "image/png")},
+                content_type="multipart/form-data",
+            ),
+            None,
+        ),
+        "drone_stitch": (
+            lambda c: c.post(
+                "/drone/stitch", data=_stitch_files(),
+                content_type="multipart/form-data",
+            ),
+            None,
+        ),
+    }
+
+
+def measure(client, request, before, warmup, iterations):
+    for _ in range(warmup):
+        if before:
+            before()
+        request(client)
+    latencies, errors, size = [], 0, 0
+    for _ in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter()
+        resp = request(client)
+        body = resp.get_data()
+        latencies.append(time.perf_counter() - start)
+        size = len(body)
+        if resp.status_code >= 400:
+            errors += 1
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "n": iterations,
+        "errors": errors,
+        "bytes": size,
+        "p50": round(percentile(latencies, 0.50), 3),
+        "p95": round(percentile(latencies, 0.95), 3),
+        "p99": round(percentile(latencies, 0.99), 3),
+        "mean": round(statistics.fmean(latencies) * 1000, 3),
+        "rps": round(iterations / total, 1) if total else 0.0,
+    }
+
+
+# ─────────────────────────────────────────────────────────
+#  Baselines
+# ─────────────────────────────────────────────────────────
+
+PARAMS = ("users", "items", "logs", "notes", "iterations", "docker_delay")
+
+
+def param_mismatches(params, baseline):
+    """``[(name, baseline_value, value)]`` for workload parameters that
+    differ from the ones the baseline was recorded with."""
+    old = baseline.get("params", {})
+    return [(k, old[k], params[k]) for k in PARAMS if k in old and old[k] != params[k]]
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return ``[(route, old_p95, new_p95)]`` for routes that regressed."""
+    regressions = []
+    for name, r in results.items():
+        old = baseline.get("routes", {}).get(name)
+        if not old:
+            continue
+        if r["p95"] > old["p95"] * (1 + threshold) and r["p95"] - old["p95"] >= min_delta_ms:
+            regressions.append((name, old["p95"], r["p95"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--items", type=int, default=20, help="items per user")
+    parser.add_argument("--logs", type=int, default=50, help="log entries per item")
+    parser.add_argument("--notes", type=int, default=200, help="notes per user")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--routes", help="comma-separated subset of routes")
+    parser.add_argument("--docker-delay", type=float, default=0.0,
+                        help="seconds the fake docker run takes")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed p95 slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore p95 changes smaller than this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    stub, github_url = start_github_stub()
+    fake_docker = os.path.join(ROOT, "bench", "fake_docker.py")
+    os.environ["FAKE_DOCKER_DELAY"] = str(args.docker_delay)
+    app = make_app(os.path.join(tmp.name, "bench.db"), {
+        "GITHUB_API_URL": github_url,
+        "GITHUB_WEB_URL": github_url,
+        "DOCKER_BIN": fake_docker,
+        "STITCH_TMP_DIR": os.path.join(tmp.name, "stitch"),
+    })
+    import app as site
+
+    for key in ("UPLOAD_FOLDER", "OUTPUT_FOLDER"):
+        app.config[key] = os.path.join(tmp.name, key.lower())
+        os.makedirs(app.config[key], exist_ok=True)
+
+    names = seed(app, args.users, args.items, args.logs, args.notes)
+    client = app.test_client()
+    client.post("/logger/login", data={"username": names[0], "password": PASSWORD})
+    notes = client.get("/logger/api/notes?limit=1")
+    ctx = {
+        "item_id": client.get("/logger/api/items?limit=1").get_json()[0]["id"],
+        "note_id": notes.get_json()[0]["id"],
+        "sync_token": notes.headers["X-Sync-Token"],
+        "png": _png(),
+    }
+
+    available = scenarios(site, ctx)
+    selected = args.routes.split(",") if args.routes else list(available)
+    unknown = set(selected) - set(available)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    results = {}
+    for name in selected:
+        request, before = available[name]
+        results[name] = measure(client, request, before, args.warmup, args.iterations)
+    stub.shutdown()
+    tmp.cleanup()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        header = (f"{'route':<18} {'req/s':>8} {'p50':>9} {'p95':>9} "
+                  f"{'p99':>9} {'bytes':>8} {'errors':>6}")
+        print(f"{args.users} users x {args.items} items x {args.logs} logs, "
+              f"{args.notes} notes/user; {args.iterations} iterations per route")
+        print(header)
+        print("-" * len(header))
+        for name, r in results.items():
+            print(f"{name:<18} {r['rps']:>8.1f} {r['p50']:>7.2f}ms {r['p95']:>7.2f}ms "
+                  f"{r['p99']:>7.2f}ms {r['bytes']:>8d} {r['errors']:>6d}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "recorded": datetime.utcnow().isoformat(timespec="seconds"),
+                "params": {k: getattr(args, k) for k in PARAMS},
+                "routes": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    mismatches = param_mismatches({k: getattr(args, k) for k in PARAMS}, baseline)
+    if mismatches:
+        print(f"Not comparing against {args.baseline}; it was recorded with "
+              + ", ".join(f"--{k.replace('_', '-')} {old} (this run: {new})"
+                          for k, old, new in mismatches)
+              + ".  Re-run with those values or use --save-baseline.", file=sys.stderr)
+        return 2
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for name, old, new in regressions:
+        print(f"REGRESSION {name}: p95 {old:.2f}ms -> {new:.2f}ms "
+              f"(+{(new / old - 1) * 100:.0f}%)", file=sys.stderr)
+    if any(r["errors"] for r in results.values()):
+        print("Some requests failed; see the errors column.", file=sys.stderr)
+        return 1
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Concurrency benchmark for the logger's SQLite write path.
+
+Simulates several gunicorn workers (processes, each with a few threads)
+hammering ``POST /api/items/<id>/log`` and ``PATCH /api/notes/<id>``
+against one shared database file, once per write-path profile:
+
+* ``default`` – SQLite defaults (rollback journal, deferred transactions)
+* ``tuned``   – WAL + synchronous=NORMAL + busy_timeout + IMMEDIATE/retry
+* ``queue``   – tuned profile plus the coalescing in-process write queue
+
+Under ``default`` writers wait on pysqlite's implicit 5 s busy timeout, so
+errors only appear once the lock queue outgrows it; compare throughput
+and p50/p95 first.  p99 and max are dominated by scheduling noise when
+the workers outnumber the CPUs.
+
+Usage::
+
+    python bench/sqlite_concurrency.py [--workers 4] [--threads 4] [--seconds 10]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from bench.common import make_app, percentile  # noqa: E402
+
+PROFILES = {
+    "default": {"LOGGER_SQLITE_TUNING": "0", "LOGGER_WRITE_QUEUE": "0"},
+    "tuned": {"LOGGER_SQLITE_TUNING": "1", "LOGGER_WRITE_QUEUE": "0"},
+    "queue": {"LOGGER_SQLITE_TUNING": "1", "LOGGER_WRITE_QUEUE": "1"},
+}
+
+
+def _make_app(db_path, profile):
+    return make_app(db_path, PROFILES[profile])
+
+
+def _client(app, username):
+    client = app.test_client()
+    client.post(
+        "/logger/signup",
+        data={"username": username, "password": "pw", "confirm": "pw"},
+    )
+    client.post("/logger/items/new", data={"name": "bench"})
+    item_id = client.get("/logger/api/items").get_json()[0]["id"]
+    note_id = client.post(
+        "/logger/api/notes", json={"title": "bench", "body": ""}
+    ).get_json()["id"]
+    return client, item_id, note_id
+
+
+def _worker(db_path, profile, worker_id, threads, seconds, barrier, results):
+    try:
+        _run_worker(db_path, profile, worker_id, threads, seconds, barrier, results)
+    except BaseException:
+        import traceback
+        barrier.abort()
+        results.put(traceback.format_exc())
+
+
+def _run_worker(db_path, profile, worker_id, threads, seconds, barrier, results):
+    app = _make_app(db_path, profile)
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    setups = [_client(app, f"w{worker_id}t{t}") for t in range(threads)]
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+
+    def run(client, item_id, note_id):
+        mine, errs, n = [], 0, 0
+        while time.perf_counter() < deadline:
+            n += 1
+            start = time.perf_counter()
+            if n % 2:
+                resp = client.post(f"/logger/api/items/{item_id}/log", json={})
+            else:
+                resp = client.patch(
+                    f"/logger/api/notes/{note_id}", json={"body": f"edit {n}"}
+                )
+            mine.append(time.perf_counter() - start)
+            if resp.status_code >= 400:
+                errs += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += errs
+
+    pool = [threading.Thread(target=run, args=s) for s in setups]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put((latencies, errors[0]))
+
+
+def run_profile(profile, workers, threads, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        # Create the schema once so workers don't race on DDL.
+        ctx = mp.get_context("spawn")
+        init = ctx.Process(target=_make_app, args=(db_path, profile))
+        init.start()
+        init.join()
+
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(
+                target=_worker,
+                args=(db_path, profile, w, threads, seconds, barrier, results),
+            )
+            for w in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        latencies, errors = [], 0
+        for _ in procs:
+            result = results.get(timeout=seconds + 300)
+            if isinstance(result, str):
+                raise RuntimeError(f"benchmark worker failed:\n{result}")
+            lat, err = result
+            latencies.extend(lat)
+            errors += err
+        for p in procs:
+            p.join()
+
+    latencies.sort()
+    return {
+        "profile": profile,
+        "ops": len(latencies),
+        "ops_s": len(latencies) / seconds,
+        "errors": errors,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] * 1000 if latencies else 0.0,
+        "mean": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument(
+        "--profiles", default=",".join(PROFILES),
+        help="comma-separated subset of: " + ", ".join(PROFILES),
+    )
+    args = parser.parse_args(argv)
+
+    print(
+        f"{args.workers} workers x {args.threads} threads, "
+        f"{args.seconds:g}s per profile"
+    )
+    header = f"{'profile':<8} {'ops/s':>8} {'errors':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    print(header)
+    print("-" * len(header))
+    for profile in args.profiles.split(","):
+        r = run_profile(profile.strip(), args.workers, args.threads, args.seconds)
+        print(
+            f"{r['profile']:<8} {r['ops_s']:>8.0f} {r['errors']:>7d} "
+            f"{r['p50']:>7.1f}ms {r['p95']:>7.1f}ms {r['p99']:>7.1f}ms {r['max']:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 from dotenv import load_dotenv
 
@@ -19,6 +20,39 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # SQLite write path (see logger/writes.py)
+    LOGGER_SQLITE_TUNING = os.environ.get("LOGGER_SQLITE_TUNING", "1") != "0"
+    LOGGER_WRITE_QUEUE = os.environ.get("LOGGER_WRITE_QUEUE", "0") == "1"
+    # "boot" | "lazy" | "off" – see logger/__init__.py
+    LOGGER_SCHEMA_CHECK = os.environ.get("LOGGER_SCHEMA_CHECK", "lazy")
+
+    # External services (overridable so tests/benchmarks can use fakes)
+    GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+    GITHUB_WEB_URL = os.environ.get("GITHUB_WEB_URL", "https://github.com")
+    DOCKER_BIN = os.environ.get("DOCKER_BIN", "/usr/bin/docker")
+    STITCH_TMP_DIR = os.environ.get("STITCH_TMP_DIR", "/var/www/tmp")
+
+    # Rate limits: counters shared by all workers (see ratelimit.py)
+    RATELIMIT_STORAGE_URI = os.environ.get(
+        "RATELIMIT_STORAGE_URI",
+        "sqlite:///" + os.path.join(
+            "/dev/shm" if os.access("/dev/shm", os.W_OK) else tempfile.gettempdir(),
+            "capsule-ratelimit.db",
+        ),
+    )
+    RATELIMIT_STRATEGY = os.environ.get("RATELIMIT_STRATEGY", "sliding-window-counter")
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = True
+
+    # Admission control for heavy routes (see admission.py); set the
+    # slots to the gunicorn worker's thread count.
+    ADMISSION_WORKER_SLOTS = int(os.environ.get("ADMISSION_WORKER_SLOTS", "4"))
+    ADMISSION_RESERVED_LIGHT = int(os.environ.get("ADMISSION_RESERVED_LIGHT", "2"))
+
+    # Instrumentation (see metrics.py); without a token /metrics is
+    # loopback-only
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+    METRICS_SLOW_REQUEST_MS = float(os.environ.get("METRICS_SLOW_REQUEST_MS", "0"))
+
     # Umami analytics (optional – set in .env to activate)
     ANALYTICS_DOMAIN = os.environ.get("ANALYTICS_DOMAIN", "")
     ANALYTICS_ID = os.environ.get("ANALYTICS_ID", "")
@@ -0,0 +1,43 @@
+"""
+Load-on-first-use helpers for costly subsystems.
+
+Anything that is slow to import or load (Pillow, project data, model
+weights) goes behind ``@once`` instead of running at import time, so
+gunicorn workers and tests only pay for what they actually touch::
+
+    @once
+    def autoencoder_model():
+        return load_weights("models/autoencoder.pth")
+
+    autoencoder_model()   # loads on the first call, cached after
+"""
+
+import functools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+def once(fn):
+    """Call zero-argument *fn* on first use only (thread-safe); later calls
+    return the same result.  A failed load raises and is retried next call."""
+    lock = threading.Lock()
+    sentinel = result = object()
+
+    @functools.wraps(fn)
+    def wrapper():
+        nonlocal result
+        if result is not sentinel:
+            return result
+        with lock:
+            if result is sentinel:
+                start = time.perf_counter()
+                value = fn()
+                log.info("Loaded %s in %.0fms", fn.__name__,
+                         (time.perf_counter() - start) * 1000)
+                result = value
+        return result
+
+    return wrapper
@@ -16,6 +16,7 @@ Usage (integrate into your portfolio):
 """
 
 import os
+import threading
 
 from flask import Blueprint, request, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
@@ -25,6 +26,8 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 
 _LOGGER_DIR = os.path.abspath(os.path.dirname(__file__))
+_SCHEMA_MODES = ("boot", "lazy", "off")
+_schema_lock = threading.Lock()
 
 
 def init_app(app):
@@ -35,9 +38,20 @@ def init_app(app):
             f"sqlite:///{os.path.join(_LOGGER_DIR, 'logger.db')}"
         )
     app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
+    # When to create missing tables/indexes and the search index:
+    # "boot" in init_app, "lazy" before the first request, "off" only via
+    # ``flask logger-init-db`` (e.g. once per deploy).
+    app.config.setdefault("LOGGER_SCHEMA_CHECK", "lazy")
+    # Deletions are remembered this long for delta sync; older sync tokens
+    # are refused (410) and clients reload the full list.
+    app.config.setdefault("LOGGER_TOMBSTONE_RETENTION_DAYS", 30)
     if not app.config.get("SECRET_KEY"):
         app.config["SECRET_KEY"] = "dev-key-change-in-production"
 
+    from . import revisions, writes
+    writes.set_defaults(app)
+    revisions.set_defaults(app)
+
     db.init_app(app)
 
     # Only set up LoginManager if the host app doesn't already have one
@@ -49,11 +63,12 @@ def init_app(app):
     # auto-redirects non-logger routes to a login page.
     _lm.login_view = None
 
-    from .models import User
+    from . import user_cache
+    user_cache.configure(app)
 
     @_lm.user_loader
     def load_user(user_id):
-        return db.session.get(User, int(user_id))
+        return user_cache.load_user(int(user_id))
 
     @_lm.unauthorized_handler
     def handle_unauthorized():
@@ -64,8 +79,55 @@ def init_app(app):
         return redirect(url_for("home"))
 
     with app.app_context():
-        from . import models  # noqa – ensure tables are registered
-        db.create_all()
+        writes.configure_engine(app)
+
+    mode = app.config["LOGGER_SCHEMA_CHECK"]
+    if mode not in _SCHEMA_MODES:
+        raise ValueError(f"LOGGER_SCHEMA_CHECK must be one of {_SCHEMA_MODES}")
+    if mode == "boot":
+        ensure_schema(app)
+    elif mode == "lazy":
+        @app.before_request
+        def _logger_schema_check():
+            ensure_schema(app)
+
+    @app.cli.command("logger-init-db")
+    def _init_db_command():
+        """Create missing logger tables, indexes and the search index."""
+        app.extensions.pop("logger_schema_ready", None)
+        ensure_schema(app)
+
+    from . import search, transfer
+    search.register_cli(app)
+    transfer.register_cli(app)
+
+
+def ensure_schema(app):
+    """Create missing tables and indexes and set up note search, once per
+    app and process.  Idempotent, so concurrent workers may all run it."""
+    if app.extensions.get("logger_schema_ready"):
+        return
+    with _schema_lock:
+        if app.extensions.get("logger_schema_ready"):
+            return
+        with app.app_context():
+            from . import models  # noqa – ensure tables are registered
+            db.create_all()
+            _ensure_indexes()
+            from .search import init_search
+            init_search()
+        app.extensions["logger_schema_ready"] = True
+
+
+def _ensure_indexes():
+    """Create indexes added after a table already existed.
+
+    ``create_all()`` skips existing tables entirely, so indexes declared
+    later (e.g. the keyset-pagination ones) would never reach older DBs.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 
 def create_blueprint():
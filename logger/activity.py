@@ -0,0 +1,165 @@
+"""
+Per-user activity heatmap (log entries per day, across all items).
+
+Counts come from one ``GROUP BY date(logged_at)`` query over ``log_entries``
+joined to ``items`` – no ORM objects are loaded.  The result is cached per
+user together with the highest log-entry id it covers; later reads only
+aggregate entries with a larger id, so each new log costs a tiny delta
+query instead of a scan of the user's history.
+
+Each read first takes a fingerprint from two indexed lookups – the
+user's newest ``Item.updated_at`` (every ``Item.log()`` bumps it) and
+newest item tombstone – and answers from the cache when it matches.  Logs
+are only deleted with their item, so a delete in any worker (and with it
+any id SQLite may reuse afterwards) changes the tombstone, and the entry
+is rebuilt.  The cache is also rebuilt when the window moves to a new day,
+and dropped locally when an item is deleted or an import finishes.
+
+The grid uses the same week-column format as the home page's GitHub
+heatmap: a list of weeks, each a list of ``{"date", "count", "level"}``.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from . import db
+from .models import Item, LogEntry, Tombstone
+
+WEEKS = 53
+_CACHE_SIZE = 512
+_cache = OrderedDict()  # user_id -> _Entry
+_cache_lock = threading.Lock()
+
+
+def week_grid(cells):
+    """Chunk day cells (oldest first) into columns of 7."""
+    heatmap, week = [], []
+    for cell in cells:
+        week.append(cell)
+        if len(week) == 7:
+            heatmap.append(week)
+            week = []
+    if week:
+        heatmap.append(week)
+    return heatmap
+
+
+def _level(count: int, peak: int) -> int:
+    if count <= 0 or peak <= 0:
+        return 0
+    return min(4, math.ceil(4 * count / peak))
+
+
+class _Entry:
+    __slots__ = ("start", "today", "counts", "last_id", "fingerprint", "payload")
+
+    def __init__(self, start, today):
+        self.start = start
+        self.today = today
+        self.counts = {}
+        self.last_id = 0
+        self.fingerprint = None  # _fingerprint() taken before the last query
+        self.payload = None
+
+    def add(self, rows):
+        """Fold ``_aggregate()`` rows into a copy of this entry."""
+        # Copy-on-write: concurrent readers may share the cached entry.
+        fresh = _Entry(self.start, self.today)
+        fresh.counts = dict(self.counts)
+        fresh.last_id = self.last_id
+        for day, count, max_id in rows:
+            fresh.counts[day] = fresh.counts.get(day, 0) + count
+            fresh.last_id = max(fresh.last_id, max_id)
+        return fresh
+
+
+def _window(today: date):
+    # Start on a Sunday so columns line up with calendar weeks.
+    first = today - timedelta(weeks=WEEKS - 1)
+    return first - timedelta(days=(first.weekday() + 1) % 7)
+
+
+def _in_window(stmt, user_id: int, start: date):
+    return stmt.join(Item, Item.id == LogEntry.item_id).where(
+        Item.user_id == user_id,
+        LogEntry.logged_at >= datetime.combine(start, datetime.min.time()),
+    )
+
+
+def _fingerprint(user_id: int):
+    tombstone = (
+        select(func.max(Tombstone.id))
+        .where(Tombstone.user_id == user_id, Tombstone.kind == "item")
+        .scalar_subquery()
+    )
+    row = db.session.execute(
+        select(func.max(Item.updated_at), tombstone)
+        .where(Item.user_id == user_id)
+    ).one()
+    return tuple(row)
+
+
+def _aggregate(user_id: int, start: date, after_id: int):
+    day = func.date(LogEntry.logged_at)
+    stmt = _in_window(
+        select(day, func.count(LogEntry.id), func.max(LogEntry.id)),
+        user_id, start,
+    ).group_by(day)
+    if after_id:
+        stmt = stmt.where(LogEntry.id > after_id)
+    return db.session.execute(stmt).all()
+
+
+def _build(entry: _Entry) -> dict:
+    peak = max(entry.counts.values(), default=0)
+    days = (entry.today - entry.start).days + 1
+    cells = []
+    for offset in range(days):
+        d = (entry.start + timedelta(days=offset)).isoformat()
+        count = entry.counts.get(d, 0)
+        cells.append({"date": d, "count": count, "level": _level(count, peak)})
+    return {
+        "total": sum(entry.counts.values()),
+        "active_days": len(entry.counts),
+        "heatmap": week_grid(cells),
+    }
+
+
+def heatmap_for_user(user_id: int, today: date | None = None) -> dict:
+    """``{"total", "active_days", "heatmap"}`` for the last year."""
+    today = today or datetime.utcnow().date()
+    start = _window(today)
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry is not None:
+            _cache.move_to_end(user_id)
+    if entry is None or entry.today != today:
+        entry = _Entry(start, today)
+
+    seen = _fingerprint(user_id)
+    if entry.payload is not None and seen == entry.fingerprint:
+        return entry.payload
+    if entry.fingerprint is None or entry.fingerprint[1] != seen[1]:
+        entry = _Entry(start, today)  # logs were deleted
+
+    # Taken before the query, so a log landing in between is at worst
+    # aggregated again by id on the next read, never missed.
+    fresh = entry.add(_aggregate(user_id, entry.start, entry.last_id))
+    fresh.fingerprint = seen
+    fresh.payload = _build(fresh)
+    entry = fresh
+    with _cache_lock:
+        _cache[user_id] = entry
+        _cache.move_to_end(user_id)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry.payload
+
+
+def invalidate(user_id: int):
+    with _cache_lock:
+        _cache.pop(user_id, None)
@@ -0,0 +1,187 @@
+"""
+Goal forecasts: projected value and time-to-target for every item.
+
+Vectorised form of the model in ``Item.apply_decay()`` / ``Item.log()``.
+Logging every ``k`` periods (first log now), each log sees ``k`` missed
+periods of decay and then adds ``alpha``, capped at ``target``::
+
+    u_1     = min(v_now + alpha, T)
+    u_{m+1} = min(r * u_m + alpha, T),     r = (1 - decay_rate) ** k
+
+Uncapped this converges to ``L = alpha / (1 - r)``, so
+``u_m = L + (u_1 - L) * r**(m-1)`` and the number of logs to reach ``T`` has
+a closed form (never, if ``L < T``).  All items x cadences x periods are
+evaluated as NumPy arrays from a single column query.
+
+Results are cached per user and reused until the user's items change
+(checked with one indexed ``max(updated_at)`` query, so a log in any
+worker invalidates it) or until the next decay step of any item.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from . import db
+from .models import Item, _utcnow
+
+DEFAULT_CADENCES = (1, 2, 3, 7)
+DEFAULT_PERIODS = 30
+MAX_PERIODS = 365
+MAX_CADENCES = 8
+MAX_CADENCE = 365  # periods between logs
+
+_CACHE_SIZE = 512
+_cache = OrderedDict()  # user_id -> (key, valid_until, body, etag)
+_cache_lock = threading.Lock()
+
+
+def _fingerprint(user_id: int):
+    row = db.session.execute(
+        select(func.count(Item.id), func.max(Item.updated_at))
+        .where(Item.user_id == user_id)
+    ).one()
+    return tuple(row)
+
+
+def _load(user_id: int):
+    rows = db.session.execute(
+        select(
+            Item.id, Item.name, Item.current_value, Item.target, Item.alpha,
+            Item.decay_rate, Item.frequency, Item.updated_at,
+        )
+        .where(Item.user_id == user_id)
+        .order_by(Item.created_at.desc(), Item.id.desc())
+    ).all()
+    return rows
+
+
+def compute(rows, now, cadences=DEFAULT_CADENCES, periods=DEFAULT_PERIODS):
+    """Forecast *rows* (item columns, see ``_load``) as of *now*.
+
+    Returns ``(items, valid_until)`` where ``valid_until`` is the moment the
+    first item's decay state changes and the result goes stale.
+    """
+    if not rows:
+        return [], None
+    import numpy as np  # deferred: costly to import and only needed here
+
+    value = np.array([r.current_value for r in rows], dtype=float)
+    target = np.array([r.target for r in rows], dtype=float)
+    alpha = np.array([r.alpha for r in rows], dtype=float)
+    keep = 1.0 - np.clip(np.array([r.decay_rate for r in rows], dtype=float), 0.0, 1.0)
+    period_h = np.array([r.frequency for r in rows], dtype=float) * 24.0
+    elapsed_h = np.array(
+        [(now - r.updated_at).total_seconds() / 3600 for r in rows], dtype=float
+    )
+
+    # Decay up to now exactly like apply_decay(): whole periods only.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        missed = np.where(period_h > 0, np.floor(elapsed_h / period_h), 0.0)
+    missed = np.maximum(missed, 0.0)
+    v_now = np.maximum(value * keep ** missed, 0.0)
+    next_step_h = float(np.min((missed + 1) * period_h - elapsed_h))
+    # Beyond datetime.max there is no date to report: treat as never.
+    horizon = (datetime.max - now).days
+    valid_until = now + timedelta(hours=next_step_h) if next_step_h < horizon * 24 else None
+
+    k = np.asarray(cadences, dtype=float)[None, :]           # (1, C)
+    v0, T, a = v_now[:, None], target[:, None], alpha[:, None]  # (I, 1)
+    r = keep[:, None] ** k                                     # (I, C)
+    u1 = np.minimum(v0 + a, T)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        limit = np.where(r < 1.0, a / (1.0 - r), np.inf)
+        # extra logs after the first one to reach T
+        decaying = np.ceil(np.log((limit - T) / (limit - u1)) / np.log(r))
+        linear = np.ceil((T - u1) / a)
+        extra = np.where(r < 1.0, np.where(limit > T, decaying, np.inf), linear)
+    extra = np.where(a <= 0, np.inf, extra)
+    extra = np.where(u1 >= T, 0.0, extra)
+    extra = np.where(np.isnan(extra), np.inf, np.maximum(extra, 0.0))
+    logs_to_target = np.where(v0 >= T, 0.0, extra + 1)
+    days_to_target = np.where(v0 >= T, 0.0, extra * k * (period_h[:, None] / 24.0))
+
+    # Projection at each future period t = 1..N for each cadence.
+    t = np.arange(1, periods + 1, dtype=float)[None, None, :]  # (1, 1, N)
+    kk = k[:, :, None]
+    m = np.floor(t / kk) + 1                                  # logs done by t
+    since_log = t - (m - 1) * kk
+    r3, lim3, u13 = r[:, :, None], limit[:, :, None], u1[:, :, None]
+    with np.errstate(invalid="ignore", over="ignore"):
+        unc = np.where(
+            r3 < 1.0,
+            lim3 + (u13 - lim3) * r3 ** (m - 1),
+            u13 + a[:, :, None] * (m - 1),
+        )
+    u_m = np.minimum(unc, T[:, :, None])
+    projected = u_m * keep[:, None, None] ** since_log           # (I, C, N)
+    decay_only = v_now[:, None] * keep[:, None] ** t[0]          # (I, N)
+
+    # Convert to Python lists in bulk; per-element NumPy access is slow.
+    projected = np.round(projected, 2).tolist()
+    decay_only = np.round(decay_only, 2).tolist()
+    reachable = np.isfinite(days_to_target) & (days_to_target < horizon)
+    logs_list = np.where(reachable, logs_to_target, -1).astype(int).tolist()
+    days_list = np.round(np.where(reachable, days_to_target, -1.0), 2).tolist()
+    v_list = np.round(v_now, 2).tolist()
+
+    items = []
+    for i, row in enumerate(rows):
+        forecasts = []
+        for c, cadence in enumerate(cadences):
+            days = days_list[i][c]
+            ok = days >= 0
+            forecasts.append({
+                "cadence_periods": cadence,
+                "cadence_days": round(cadence * row.frequency, 4),
+                "logs_to_target": logs_list[i][c] if ok else None,
+                "days_to_target": days if ok else None,
+                "eta": (now + timedelta(days=days)).isoformat() if ok else None,
+                "projected": projected[i][c],
+            })
+        items.append({
+            "id": row.id,
+            "name": row.name,
+            "current_value": v_list[i],
+            "target": row.target,
+            "frequency": row.frequency,
+            "forecast": forecasts,
+            "decay_only": decay_only[i],
+        })
+    return items, valid_until
+
+
+def forecast_json(user_id: int, cadences=DEFAULT_CADENCES,
+                  periods=DEFAULT_PERIODS) -> tuple[str, str]:
+    """Cached ``(json_body, etag)`` for ``/api/items/forecast``.
+
+    The encoded body is what gets cached, so a hit costs one aggregate
+    query and no NumPy or JSON work.
+    """
+    now = _utcnow()
+    key = (_fingerprint(user_id), tuple(cadences), periods)
+    with _cache_lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] == key and (entry[1] is None or now < entry[1]):
+            _cache.move_to_end(user_id)
+            return entry[2], entry[3]
+
+    items, valid_until = compute(_load(user_id), now, cadences, periods)
+    body = json.dumps({
+        "as_of": now.isoformat(),
+        "periods": periods,
+        "cadences": list(cadences),
+        "items": items,
+    }, separators=(",", ":"))
+    etag = hashlib.sha1(body.encode()).hexdigest()
+    with _cache_lock:
+        _cache[user_id] = (key, valid_until, body, etag)
+        _cache.move_to_end(user_id)
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return body, etag
@@ -25,8 +25,12 @@ class User(UserMixin, db.Model):
         "Note", backref="owner", lazy="dynamic", cascade="all, delete-orphan"
     )
 
+    @staticmethod
+    def hash_password(password: str) -> str:
+        return generate_password_hash(password)
+
     def set_password(self, password: str):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = self.hash_password(password)
 
     def check_password(self, password: str) -> bool:
         return check_password_hash(self.password_hash, password)
@@ -36,6 +40,10 @@ class Item(db.Model):
     """A trackable goal / habit."""
 
     __tablename__ = "items"
+    __table_args__ = (
+        db.Index("ix_items_user_created", "user_id", "created_at", "id"),
+        db.Index("ix_items_user_updated", "user_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -124,6 +132,9 @@ class Item(db.Model):
 
 class LogEntry(db.Model):
     __tablename__ = "log_entries"
+    __table_args__ = (
+        db.Index("ix_log_entries_item_logged", "item_id", "logged_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=False)
@@ -139,6 +150,10 @@ class Note(db.Model):
     """A simple note – Google Keep / Apple Notes style."""
 
     __tablename__ = "notes"
+    __table_args__ = (
+        db.Index("ix_notes_user_order", "user_id", "pinned", "updated_at", "id"),
+        db.Index("ix_notes_user_updated", "user_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -161,3 +176,60 @@ class Note(db.Model):
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
         }
+
+
+class NoteRevision(db.Model):
+    """One saved state of a note (see ``revisions.py``).
+
+    Snapshot rows hold the full body; delta rows hold ``delta`` – the edit
+    ops that turn the previous revision's body into this one.
+    """
+
+    __tablename__ = "note_revisions"
+    __table_args__ = (
+        db.Index("ix_note_revisions_note_rev", "note_id", "rev", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    note_id = db.Column(db.Integer, db.ForeignKey("notes.id"), nullable=False)
+    rev = db.Column(db.Integer, nullable=False)
+    snapshot = db.Column(db.Boolean, nullable=False, default=False)
+    title = db.Column(db.String(200), nullable=False, default="")
+    color = db.Column(db.String(20), nullable=False, default="default")
+    pinned = db.Column(db.Boolean, nullable=False, default=False)
+    body = db.Column(db.Text)    # snapshots only
+    delta = db.Column(db.Text)   # deltas only: JSON [[start, end, text], ...]
+    created_at = db.Column(db.DateTime, nullable=False, default=_utcnow)
+
+
+# ─────────────────────────────────────────────────────────
+#  TOMBSTONE  (deletion markers for delta sync)
+# ─────────────────────────────────────────────────────────
+
+class Tombstone(db.Model):
+    """Records a deleted item/note so delta-sync clients can drop it."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        db.Index("ix_tombstones_user_kind_deleted", "user_id", "kind", "deleted_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # "item" | "note"
+    object_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=_utcnow)
+
+    @classmethod
+    def record(cls, obj, kind: str) -> "Tombstone":
+        """Add a tombstone for *obj* to the session (caller commits)."""
+        stone = cls(user_id=obj.user_id, kind=kind, object_id=obj.id)
+        db.session.add(stone)
+        return stone
+
+    @classmethod
+    def prune(cls, user_id: int, kind: str, before: datetime):
+        """Delete the user's *kind* tombstones older than *before*."""
+        cls.query.filter(
+            cls.user_id == user_id, cls.kind == kind, cls.deleted_at < before
+        ).delete(synchronize_session=False)
@@ -0,0 +1,86 @@
+"""
+Keyset (cursor) pagination and delta-sync helpers for the Logger API.
+
+Cursors are opaque, URL-safe tokens that encode the sort-key values of the
+last row a client has seen, so deeper pages cost the same as the first one
+(no OFFSET scan).  Sync tokens use the same encoding for a single timestamp.
+"""
+
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, tuple_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+# Delta queries reach back this far before the sync token: a write stamps
+# ``updated_at`` before it commits, so it can become visible only after a
+# later token was handed out.  Clients merge delta rows by id.
+SYNC_OVERLAP = timedelta(seconds=10)
+
+
+def encode_cursor(values) -> str:
+    """Encode a list of sort-key values into an opaque cursor string."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, columns) -> list:
+    """Decode a cursor back into values typed for *columns*.
+
+    Raises ``ValueError`` for anything that is not a cursor we issued.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as exc:  # binascii / unicode / json errors
+        raise ValueError("malformed cursor") from exc
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError("malformed cursor")
+    typed = []
+    for col, value in zip(columns, values):
+        try:
+            if isinstance(col.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, (int, float, str)):
+                raise TypeError(type(value).__name__)
+        except (TypeError, ValueError) as exc:
+            raise ValueError("malformed cursor") from exc
+        typed.append(value)
+    return typed
+
+
+def row_cursor(row, columns) -> str:
+    """Cursor pointing just past *row* for the given sort columns."""
+    return encode_cursor([getattr(row, col.key) for col in columns])
+
+
+def clamp_limit(limit, default=DEFAULT_LIMIT) -> int:
+    if limit is None:
+        return default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def keyset_page(query, columns, cursor=None, limit=DEFAULT_LIMIT, backwards=False):
+    """Fetch one page of *query* ordered by *columns* descending.
+
+    With ``backwards=True`` the page *before* the cursor is returned (still
+    in descending order).  Returns ``(rows, has_more)`` where ``has_more``
+    tells whether further rows exist in the direction of travel.
+    """
+    key = tuple_(*columns)
+    if cursor is not None:
+        bound = tuple_(*decode_cursor(cursor, columns))
+        query = query.filter(key > bound if backwards else key < bound)
+    order = [c.asc() if backwards else c.desc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if backwards:
+        rows.reverse()
+    return rows, has_more
@@ -0,0 +1,233 @@
+"""
+Note revision history, stored as compact deltas.
+
+Each change to a note appends a ``NoteRevision`` holding the note's new
+state.  Title, colour and pinned are small and stored as-is; the body is
+stored as edit ops against the previous revision's body –
+``[[start, end, text], ...]``, replacing ``old[start:end]`` with ``text``.
+Small edits become a single op after trimming the common prefix and
+suffix; larger ones are diffed line by line so separate edits stay
+separate.
+
+A full snapshot is written every ``LOGGER_NOTE_SNAPSHOT_EVERY`` revisions,
+so rebuilding any revision replays at most K-1 deltas.  A note's first
+edit also records its pre-edit state as revision 1, so notes that are
+never edited cost nothing.
+
+Storage per edit is bounded: a delta is only kept while it is smaller
+than the body (otherwise the revision is a snapshot).  Once a note holds
+more than ``LOGGER_NOTE_MAX_REVISIONS`` + K revisions, the next snapshot
+prunes everything before the snapshot the newest max revisions need, so
+a note keeps at most about max + 2K.  PATCHes that change nothing never
+reach this module.
+
+Config keys (defaults set in ``set_defaults``)::
+
+    LOGGER_NOTE_SNAPSHOT_EVERY  10
+    LOGGER_NOTE_MAX_REVISIONS   100
+"""
+
+import json
+import os
+from difflib import SequenceMatcher
+
+from flask import current_app
+from sqlalchemy import delete, func, select
+
+from . import db
+from .models import NoteRevision, _utcnow
+
+_LINE_DIFF_MIN = 256  # changed chars below which one op is compact enough
+
+
+def set_defaults(app):
+    app.config.setdefault("LOGGER_NOTE_SNAPSHOT_EVERY", 10)
+    app.config.setdefault("LOGGER_NOTE_MAX_REVISIONS", 100)
+
+
+# ─────────────────────────────────────────────────────────
+#  Text deltas
+# ─────────────────────────────────────────────────────────
+
+def diff(old: str, new: str) -> list:
+    """Edit ops (ascending, offsets into *old*) that turn *old* into *new*."""
+    prefix = len(os.path.commonprefix([old, new]))
+    limit = min(len(old), len(new)) - prefix
+    suffix = min(len(os.path.commonprefix([old[::-1], new[::-1]])), limit)
+    a = old[prefix:len(old) - suffix]
+    b = new[prefix:len(new) - suffix]
+    if not a and not b:
+        return []
+    if len(a) + len(b) < _LINE_DIFF_MIN:
+        return [[prefix, prefix + len(a), b]]
+
+    a_lines = a.splitlines(keepends=True)
+    b_lines = b.splitlines(keepends=True)
+    offsets = [prefix]
+    for line in a_lines:
+        offsets.append(offsets[-1] + len(line))
+    matcher = SequenceMatcher(None, a_lines, b_lines, autojunk=False)
+    return [
+        [offsets[i1], offsets[i2], "".join(b_lines[j1:j2])]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def patch(text: str, ops) -> str:
+    """Apply ops produced by ``diff()``."""
+    out, pos = [], 0
+    for start, end, insert in ops:
+        out.append(text[pos:start])
+        out.append(insert)
+        pos = end
+    out.append(text[pos:])
+    return "".join(out)
+
+
+# ─────────────────────────────────────────────────────────
+#  Recording
+# ─────────────────────────────────────────────────────────
+
+def changes(note, data: dict) -> dict:
+    """The fields of PATCH-style *data* whose value differs from *note*."""
+    wanted = {}
+    if "title" in data:
+        wanted["title"] = data["title"].strip()
+    if "body" in data:
+        wanted["body"] = data["body"].strip()
+    if "color" in data:
+        wanted["color"] = data["color"]
+    if "pinned" in data:
+        wanted["pinned"] = bool(data["pinned"])
+    return {k: v for k, v in wanted.items() if getattr(note, k) != v}
+
+
+def _revision(note, rev, **fields):
+    return NoteRevision(
+        note_id=note.id, rev=rev, title=note.title, color=note.color,
+        pinned=note.pinned, **fields,
+    )
+
+
+def record(note, new_values: dict) -> NoteRevision:
+    """Apply *new_values* (from ``changes()``) to *note* and add the new
+    revision to the session.  Call inside the write unit; caller commits."""
+    first_rev, last_rev, last_snapshot = db.session.execute(
+        select(
+            func.min(NoteRevision.rev),
+            func.max(NoteRevision.rev),
+            func.max(NoteRevision.rev).filter(NoteRevision.snapshot),
+        ).where(NoteRevision.note_id == note.id)
+    ).one()
+    if last_rev is None:
+        db.session.add(_revision(
+            note, 1, snapshot=True, body=note.body, created_at=note.updated_at,
+        ))
+        first_rev = last_rev = last_snapshot = 1
+
+    rev = last_rev + 1
+    body = new_values.get("body", note.body)
+    every = current_app.config["LOGGER_NOTE_SNAPSHOT_EVERY"]
+    delta = None
+    if rev - (last_snapshot or 0) < every:
+        delta = json.dumps(diff(note.body, body), ensure_ascii=False,
+                           separators=(",", ":"))
+        if len(delta) >= len(body):
+            delta = None
+    keep = current_app.config["LOGGER_NOTE_MAX_REVISIONS"]
+    if delta is None and rev - first_rev >= keep + every:
+        # Prune on snapshots only, at most once per K edits, and before
+        # touching the note so the queries do not autoflush.
+        _prune(note.id, rev - keep + 1)
+
+    for key, value in new_values.items():
+        setattr(note, key, value)
+    if delta is None:
+        revision = _revision(note, rev, snapshot=True, body=body)
+    else:
+        revision = _revision(note, rev, delta=delta)
+    revision.created_at = _utcnow()
+    db.session.add(revision)
+    return revision
+
+
+def _prune(note_id: int, oldest_kept: int):
+    """Drop revisions older than the snapshot *oldest_kept* is built on."""
+    base = db.session.scalar(
+        select(func.max(NoteRevision.rev)).where(
+            NoteRevision.note_id == note_id,
+            NoteRevision.snapshot,
+            NoteRevision.rev <= oldest_kept,
+        )
+    )
+    if base:
+        db.session.execute(
+            delete(NoteRevision).where(
+                NoteRevision.note_id == note_id, NoteRevision.rev < base
+            )
+        )
+
+
+def delete_for_note(note_id: int):
+    db.session.execute(delete(NoteRevision).where(NoteRevision.note_id == note_id))
+
+
+# ─────────────────────────────────────────────────────────
+#  Reading
+# ─────────────────────────────────────────────────────────
+
+def history(note_id: int) -> list:
+    """Revision metadata, newest first (no bodies)."""
+    rows = db.session.execute(
+        select(
+            NoteRevision.rev, NoteRevision.snapshot, NoteRevision.title,
+            func.length(func.coalesce(NoteRevision.body, NoteRevision.delta)),
+            NoteRevision.created_at,
+        )
+        .where(NoteRevision.note_id == note_id)
+        .order_by(NoteRevision.rev.desc())
+    ).all()
+    return [
+        {
+            "rev": rev, "snapshot": snapshot, "title": title,
+            "stored_size": size or 0, "created_at": created_at.isoformat(),
+        }
+        for rev, snapshot, title, size, created_at in rows
+    ]
+
+
+def state_at(note_id: int, rev: int) -> dict | None:
+    """The note's fields as of revision *rev*, or ``None`` if it is gone."""
+    base = db.session.scalar(
+        select(func.max(NoteRevision.rev)).where(
+            NoteRevision.note_id == note_id,
+            NoteRevision.snapshot,
+            NoteRevision.rev <= rev,
+        )
+    )
+    if base is None:
+        return None
+    rows = db.session.scalars(
+        select(NoteRevision)
+        .where(
+            NoteRevision.note_id == note_id,
+            NoteRevision.rev >= base,
+            NoteRevision.rev <= rev,
+        )
+        .order_by(NoteRevision.rev)
+    ).all()
+    if rows[-1].rev != rev:
+        return None
+    body = rows[0].body
+    for row in rows[1:]:
+        body = patch(body, json.loads(row.delta))
+    last = rows[-1]
+    return {
+        "rev": last.rev,
+        "title": last.title,
+        "body": body,
+        "color": last.color,
+        "pinned": last.pinned,
+        "created_at": last.created_at.isoformat(),
+    }
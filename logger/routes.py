@@ -1,12 +1,115 @@
-from flask import render_template, request, redirect, url_for, jsonify, flash, current_app
+import io
+from datetime import timedelta
+
+from flask import (
+    Response, render_template, request, redirect, url_for, jsonify, flash,
+    current_app, stream_with_context,
+)
 from flask_login import login_user, logout_user, current_user
 
-from . import db
-from .models import User, Item, LogEntry, Note
+from . import activity, db, forecast, revisions, user_cache
+from .models import User, Item, LogEntry, Note, Tombstone, _utcnow
+from .pagination import (
+    SYNC_OVERLAP, clamp_limit, decode_cursor, encode_cursor, keyset_page, row_cursor,
+)
+from .search import search_notes
+from .transfer import MIMETYPES, export_chunks, import_records
+from .writes import commit_opportunistic, run_write
 
 # Routes that guests (unauthenticated users) may access
 _OPEN_ENDPOINTS = {"logger.login", "logger.signup", "logger.static"}
 
+# Sort keys (all descending) shared by pages and the JSON API
+_ITEM_ORDER = (Item.created_at, Item.id)
+_NOTE_ORDER = (Note.pinned, Note.updated_at, Note.id)
+
+DASHBOARD_PER_PAGE = 20
+JOURNAL_FIRST_PAGE = 50
+
+
+def _item_form_fields():
+    """Parse the create/edit item form into Item column values."""
+    return {
+        "name": request.form["name"],
+        "description": request.form.get("description", ""),
+        "frequency": float(request.form.get("frequency", 1)),
+        "alpha": float(request.form.get("alpha", 1)),
+        "decay_rate": float(request.form.get("decay_rate", 0.05)),
+        "target": float(request.form.get("target", 100)),
+    }
+
+
+def _json_conditional(payload, headers=None):
+    """jsonify *payload* with a strong ETag; answers 304 on If-None-Match."""
+    resp = jsonify(payload)
+    for key, value in (headers or {}).items():
+        resp.headers[key] = value
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
+def _tombstone_cutoff():
+    """Tombstones older than this are pruned, so sync tokens expire too."""
+    days = current_app.config["LOGGER_TOMBSTONE_RETENTION_DAYS"]
+    return _utcnow() - timedelta(days=days)
+
+
+def _record_deletion(obj, kind):
+    """Tombstone *obj* for delta sync and drop the user's expired ones."""
+    Tombstone.record(obj, kind)
+    Tombstone.prune(obj.user_id, kind, _tombstone_cutoff())
+
+
+def _list_or_delta(model, kind, order):
+    """Shared body of the paginated / delta-sync list endpoints.
+
+    * ``?since=<token>`` – only rows changed after the token plus ids of rows
+      deleted since then: ``{"changed": [...], "deleted": [...]}``, with the
+      next token in ``X-Sync-Token`` so the body's ETag stays stable.
+      Reaches back ``SYNC_OVERLAP`` before the token, so a delta may repeat
+      rows the client already has; merge by id.  A token older than the
+      tombstone retention gets ``410`` and the client must reload in full.
+    * otherwise – one keyset page (``?cursor=`` / ``?limit=``) as a JSON
+      array; ``X-Next-Cursor`` is set when more rows follow.
+
+    ``X-Sync-Token`` is the token to pass as ``since`` afterwards.
+    """
+    headers = {"X-Sync-Token": encode_cursor([_utcnow()])}
+    base = model.query.filter_by(user_id=current_user.id)
+    since = request.args.get("since")
+    try:
+        if since:
+            (since_at,) = decode_cursor(since, (model.updated_at,))
+            since_at -= SYNC_OVERLAP
+            if since_at < _tombstone_cutoff():
+                return jsonify({"error": "Sync token expired."}), 410
+            changed = (
+                base.filter(model.updated_at > since_at)
+                .order_by(*[c.desc() for c in order])
+                .all()
+            )
+            deleted = [
+                t.object_id
+                for t in Tombstone.query.filter(
+                    Tombstone.user_id == current_user.id,
+                    Tombstone.kind == kind,
+                    Tombstone.deleted_at > since_at,
+                )
+            ]
+            return _json_conditional({
+                "changed": [r.to_dict() for r in changed],
+                "deleted": deleted,
+            }, headers)
+        limit = clamp_limit(request.args.get("limit", type=int))
+        rows, has_more = keyset_page(
+            base, order, cursor=request.args.get("cursor"), limit=limit
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor."}), 400
+    if has_more:
+        headers["X-Next-Cursor"] = row_cursor(rows[-1], order)
+    return _json_conditional([r.to_dict() for r in rows], headers)
+
 
 def register_routes(bp):
     """Attach all routes to the given Blueprint."""
@@ -32,15 +135,24 @@ def register_routes(bp):
                 flash("Username and password are required.", "error")
             elif password != confirm:
                 flash("Passwords do not match.", "error")
-            elif User.query.filter_by(username=username).first():
-                flash("Username already taken.", "error")
             else:
-                user = User(username=username)
-                user.set_password(password)
-                db.session.add(user)
-                db.session.commit()
-                login_user(user)
-                return redirect(url_for("logger.dashboard"))
+                # Hash outside the write transaction; it is deliberately slow.
+                password_hash = User.hash_password(password)
+
+                def unit():
+                    if User.query.filter_by(username=username).first():
+                        return None
+                    user = User(username=username, password_hash=password_hash)
+                    db.session.add(user)
+                    db.session.flush()
+                    return user.id
+
+                user_id = run_write(unit)
+                if user_id is None:
+                    flash("Username already taken.", "error")
+                else:
+                    login_user(db.session.get(User, user_id))
+                    return redirect(url_for("logger.dashboard"))
         return render_template("logger/signup.html")
 
     @bp.route("/login", methods=["GET", "POST"])
@@ -61,39 +173,55 @@ def register_routes(bp):
     @bp.route("/logout")
     def logout():
         logout_user()
-        return redirect(url_for("logger.login"))
+        resp = redirect(url_for("logger.login"))
+        # Drops the journal's cached notes (localStorage) with the session.
+        resp.headers["Clear-Site-Data"] = '"storage"'
+        return resp
 
     # ─── Pages ────────────────────────────────────────────────────────
     @bp.route("/")
     def dashboard():
-        page = request.args.get("page", 1, type=int)
-        per_page = 20
-        pagination = (
-            Item.query.filter_by(user_id=current_user.id)
-            .order_by(Item.created_at.desc())
-            .paginate(page=page, per_page=per_page, error_out=False)
-        )
-        for item in pagination.items:
+        after = request.args.get("after")
+        before = request.args.get("before")
+        base = Item.query.filter_by(user_id=current_user.id)
+        try:
+            if before:
+                items, has_prev = keyset_page(
+                    base, _ITEM_ORDER, cursor=before,
+                    limit=DASHBOARD_PER_PAGE, backwards=True,
+                )
+                has_next = True
+            else:
+                items, has_next = keyset_page(
+                    base, _ITEM_ORDER, cursor=after, limit=DASHBOARD_PER_PAGE
+                )
+                has_prev = after is not None
+        except ValueError:
+            return redirect(url_for("logger.dashboard"))
+        for item in items:
             item.apply_decay()
-        db.session.commit()
+        if not commit_opportunistic():
+            for item in items:
+                item.apply_decay()
+        pagination = {
+            "prev": row_cursor(items[0], _ITEM_ORDER) if items and has_prev else None,
+            "next": row_cursor(items[-1], _ITEM_ORDER) if items and has_next else None,
+        }
         return render_template(
-            "logger/dashboard.html", items=pagination.items, pagination=pagination
+            "logger/dashboard.html", items=items, pagination=pagination,
+            activity=activity.heatmap_for_user(current_user.id),
         )
 
     @bp.route("/items/new", methods=["GET", "POST"])
     def create_item():
         if request.method == "POST":
-            item = Item(
-                user_id=current_user.id,
-                name=request.form["name"],
-                description=request.form.get("description", ""),
-                frequency=float(request.form.get("frequency", 1)),
-                alpha=float(request.form.get("alpha", 1)),
-                decay_rate=float(request.form.get("decay_rate", 0.05)),
-                target=float(request.form.get("target", 100)),
-            )
-            db.session.add(item)
-            db.session.commit()
+            fields = _item_form_fields()
+            user_id = current_user.id
+
+            def unit():
+                db.session.add(Item(user_id=user_id, **fields))
+
+            run_write(unit)
             return redirect(url_for("logger.dashboard"))
         return render_template("logger/item_form.html", item=None)
 
@@ -103,46 +231,59 @@ def register_routes(bp):
             id=item_id, user_id=current_user.id
         ).first_or_404()
         item.apply_decay()
-        db.session.commit()
+        if not commit_opportunistic():
+            item.apply_decay()
         logs = item.logs.order_by(LogEntry.logged_at.desc()).limit(50).all()
         return render_template("logger/item_detail.html", item=item, logs=logs)
 
     @bp.route("/items/<int:item_id>/edit", methods=["GET", "POST"])
     def edit_item(item_id):
-        item = Item.query.filter_by(
-            id=item_id, user_id=current_user.id
-        ).first_or_404()
+        user_id = current_user.id
         if request.method == "POST":
-            item.name = request.form["name"]
-            item.description = request.form.get("description", "")
-            item.frequency = float(request.form.get("frequency", 1))
-            item.alpha = float(request.form.get("alpha", 1))
-            item.decay_rate = float(request.form.get("decay_rate", 0.05))
-            item.target = float(request.form.get("target", 100))
-            db.session.commit()
-            return redirect(url_for("logger.item_detail", item_id=item.id))
+            fields = _item_form_fields()
+
+            def unit():
+                item = Item.query.filter_by(id=item_id, user_id=user_id).first_or_404()
+                for key, value in fields.items():
+                    setattr(item, key, value)
+
+            run_write(unit)
+            return redirect(url_for("logger.item_detail", item_id=item_id))
+        item = Item.query.filter_by(id=item_id, user_id=user_id).first_or_404()
         return render_template("logger/item_form.html", item=item)
 
     @bp.route("/items/<int:item_id>/delete", methods=["POST"])
     def delete_item(item_id):
-        item = Item.query.filter_by(
-            id=item_id, user_id=current_user.id
-        ).first_or_404()
-        db.session.delete(item)
-        db.session.commit()
+        user_id = current_user.id
+
+        def unit():
+            item = Item.query.filter_by(id=item_id, user_id=user_id).first_or_404()
+            _record_deletion(item, "item")
+            db.session.delete(item)
+
+        run_write(unit)
+        activity.invalidate(user_id)
         return redirect(url_for("logger.dashboard"))
 
     # ─── API ──────────────────────────────────────────────────────────
+    @bp.route("/api/cache-stats")
+    def api_cache_stats():
+        """Per-process user-loader cache counters."""
+        return jsonify({"user_cache": user_cache.stats()})
+
     @bp.route("/api/items/<int:item_id>/log", methods=["POST"])
     def api_log(item_id):
-        item = Item.query.filter_by(
-            id=item_id, user_id=current_user.id
-        ).first_or_404()
+        user_id = current_user.id
         data = request.get_json(silent=True) or {}
         amount = data.get("amount")
-        item.log(amount=float(amount) if amount is not None else None)
-        db.session.commit()
-        return jsonify(item.to_dict())
+        amount = float(amount) if amount is not None else None
+
+        def unit():
+            item = Item.query.filter_by(id=item_id, user_id=user_id).first_or_404()
+            item.log(amount=amount)
+            return item.to_dict()
+
+        return jsonify(run_write(unit))
 
     @bp.route("/api/items/<int:item_id>")
     def api_item(item_id):
@@ -173,71 +314,178 @@ def register_routes(bp):
             })
         return jsonify({"target": item.target, "points": points})
 
+    @bp.route("/api/activity")
+    def api_activity():
+        """Year-long log-activity heatmap across all items."""
+        return _json_conditional(activity.heatmap_for_user(current_user.id))
+
+    @bp.route("/api/items/forecast")
+    def api_items_forecast():
+        """Projected values and time-to-target for all items.
+
+        ``?periods=N`` (default 30) future periods per item and
+        ``?cadences=1,2,3,7`` – log once every k periods.
+        """
+        periods = request.args.get("periods", forecast.DEFAULT_PERIODS, type=int)
+        raw = request.args.get("cadences")
+        try:
+            cadences = (
+                tuple(sorted({int(c) for c in raw.split(",") if c.strip()}))
+                if raw else forecast.DEFAULT_CADENCES
+            )
+        except ValueError:
+            return jsonify({"error": "cadences must be comma-separated integers."}), 400
+        if (not cadences or len(cadences) > forecast.MAX_CADENCES
+                or min(cadences) < 1 or max(cadences) > forecast.MAX_CADENCE):
+            return jsonify({"error": "cadences must be 1-8 integers from 1 to 365."}), 400
+        periods = max(1, min(periods, forecast.MAX_PERIODS))
+        body, etag = forecast.forecast_json(current_user.id, cadences, periods)
+        resp = Response(body, mimetype="application/json")
+        resp.set_etag(etag)
+        return resp.make_conditional(request)
+
     @bp.route("/api/items")
     def api_items():
-        items = (
-            Item.query.filter_by(user_id=current_user.id)
-            .order_by(Item.created_at.desc())
-            .all()
+        return _list_or_delta(Item, "item", _ITEM_ORDER)
+
+    # ─── Export / import ──────────────────────────────────────────────
+    @bp.route("/api/export")
+    def api_export():
+        """Stream all items, log entries and notes (``?format=ndjson|csv``)."""
+        fmt = request.args.get("format", "ndjson")
+        if fmt not in MIMETYPES:
+            return jsonify({"error": "format must be ndjson or csv."}), 400
+        stamp = _utcnow().strftime("%Y%m%d")
+        return Response(
+            stream_with_context(export_chunks(current_user.id, fmt)),
+            mimetype=MIMETYPES[fmt],
+            headers={
+                "Content-Disposition":
+                    f'attachment; filename="logger-export-{stamp}.{fmt}"',
+            },
         )
-        return jsonify([i.to_dict() for i in items])
+
+    @bp.route("/api/import", methods=["POST"])
+    def api_import():
+        """Bulk import an export body; CSV if the Content-Type says so."""
+        fmt = "csv" if request.mimetype == "text/csv" else "ndjson"
+        lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+        try:
+            result = import_records(current_user.id, lines, fmt)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        finally:
+            # Imported logs do not touch their items' updated_at.
+            activity.invalidate(current_user.id)
+        return jsonify(result), 201
 
     # ─── Journal pages ────────────────────────────────────────────────
     @bp.route("/journal")
     def journal():
-        notes = (
-            Note.query.filter_by(user_id=current_user.id)
-            .order_by(Note.pinned.desc(), Note.updated_at.desc())
-            .all()
+        sync_token = encode_cursor([_utcnow()])
+        notes, has_more = keyset_page(
+            Note.query.filter_by(user_id=current_user.id),
+            _NOTE_ORDER, limit=JOURNAL_FIRST_PAGE,
+        )
+        return render_template(
+            "logger/journal.html",
+            notes=[n.to_dict() for n in notes],
+            next_cursor=row_cursor(notes[-1], _NOTE_ORDER) if has_more else None,
+            sync_token=sync_token,
         )
-        return render_template("logger/journal.html", notes=[n.to_dict() for n in notes])
 
     # ─── Journal API ──────────────────────────────────────────────────
     @bp.route("/api/notes", methods=["GET"])
     def api_notes():
-        notes = (
-            Note.query.filter_by(user_id=current_user.id)
-            .order_by(Note.pinned.desc(), Note.updated_at.desc())
-            .all()
-        )
-        return jsonify([n.to_dict() for n in notes])
+        return _list_or_delta(Note, "note", _NOTE_ORDER)
+
+    @bp.route("/api/notes/search")
+    def api_search_notes():
+        """Ranked full-text search: ``?q=<text>&limit=<n>``."""
+        query = request.args.get("q", "").strip()
+        limit = clamp_limit(request.args.get("limit", type=int), default=20)
+        return jsonify(search_notes(current_user.id, query, limit=limit))
 
     @bp.route("/api/notes", methods=["POST"])
     def api_create_note():
+        user_id = current_user.id
         data = request.get_json(silent=True) or {}
-        note = Note(
-            user_id=current_user.id,
-            title=data.get("title", "").strip(),
-            body=data.get("body", "").strip(),
-            color=data.get("color", "default"),
-            pinned=bool(data.get("pinned", False)),
-        )
-        db.session.add(note)
-        db.session.commit()
-        return jsonify(note.to_dict()), 201
+
+        def unit():
+            note = Note(
+                user_id=user_id,
+                title=data.get("title", "").strip(),
+                body=data.get("body", "").strip(),
+                color=data.get("color", "default"),
+                pinned=bool(data.get("pinned", False)),
+            )
+            db.session.add(note)
+            db.session.flush()
+            return note.to_dict()
+
+        return jsonify(run_write(unit)), 201
 
     @bp.route("/api/notes/<int:note_id>", methods=["PATCH"])
     def api_update_note(note_id):
-        note = Note.query.filter_by(
-            id=note_id, user_id=current_user.id
-        ).first_or_404()
+        user_id = current_user.id
         data = request.get_json(silent=True) or {}
-        if "title" in data:
-            note.title = data["title"].strip()
-        if "body" in data:
-            note.body = data["body"].strip()
-        if "color" in data:
-            note.color = data["color"]
-        if "pinned" in data:
-            note.pinned = bool(data["pinned"])
-        db.session.commit()
-        return jsonify(note.to_dict())
+        note = Note.query.filter_by(id=note_id, user_id=user_id).first_or_404()
+        if not revisions.changes(note, data):
+            # Autosave resends unchanged notes: no write, no revision.
+            return jsonify(note.to_dict())
+
+        def unit():
+            note = Note.query.filter_by(id=note_id, user_id=user_id).first_or_404()
+            changes = revisions.changes(note, data)
+            if changes:
+                revisions.record(note, changes)
+                db.session.flush()
+            return note.to_dict()
+
+        return jsonify(run_write(unit))
+
+    @bp.route("/api/notes/<int:note_id>/revisions")
+    def api_note_revisions(note_id):
+        note = Note.query.filter_by(id=note_id, user_id=current_user.id).first_or_404()
+        return jsonify({"note_id": note.id, "revisions": revisions.history(note.id)})
+
+    @bp.route("/api/notes/<int:note_id>/revisions/<int:rev>")
+    def api_note_revision(note_id, rev):
+        note = Note.query.filter_by(id=note_id, user_id=current_user.id).first_or_404()
+        state = revisions.state_at(note.id, rev)
+        if state is None:
+            return jsonify({"error": "Revision not found."}), 404
+        return jsonify(state)
+
+    @bp.route("/api/notes/<int:note_id>/revisions/<int:rev>/restore", methods=["POST"])
+    def api_restore_note_revision(note_id, rev):
+        user_id = current_user.id
+
+        def unit():
+            note = Note.query.filter_by(id=note_id, user_id=user_id).first_or_404()
+            state = revisions.state_at(note.id, rev)
+            if state is None:
+                return None
+            changes = revisions.changes(note, state)
+            if changes:
+                revisions.record(note, changes)
+                db.session.flush()
+            return note.to_dict()
+
+        result = run_write(unit)
+        if result is None:
+            return jsonify({"error": "Revision not found."}), 404
+        return jsonify(result)
 
     @bp.route("/api/notes/<int:note_id>", methods=["DELETE"])
     def api_delete_note(note_id):
-        note = Note.query.filter_by(
-            id=note_id, user_id=current_user.id
-        ).first_or_404()
-        db.session.delete(note)
-        db.session.commit()
+        user_id = current_user.id
+
+        def unit():
+            note = Note.query.filter_by(id=note_id, user_id=user_id).first_or_404()
+            _record_deletion(note, "note")
+            revisions.delete_for_note(note.id)
+            db.session.delete(note)
+
+        run_write(unit)
         return jsonify({"ok": True})
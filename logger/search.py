@@ -0,0 +1,217 @@
+"""
+Full-text search over journal notes (SQLite FTS5).
+
+``notes_fts`` is an external-content FTS5 table mirroring ``notes.title`` and
+``notes.body``; triggers on ``notes`` keep it in sync, so ORM writes and raw
+SQL both stay indexed.  On databases without FTS5 (other engines, or SQLite
+builds compiled without it) search falls back to a LIKE scan.
+
+Rebuild the index for an existing database with::
+
+    flask --app app logger-rebuild-search
+"""
+
+import logging
+import re
+from html import escape
+
+import click
+from sqlalchemy import text
+
+from . import db
+from .models import Note
+
+log = logging.getLogger(__name__)
+
+_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+        title, body,
+        content='notes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE OF title, body ON notes
+    BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO notes_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+# Private-use sentinels so highlighting survives HTML escaping.
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# bm25 column weights: a title hit counts for more than a body hit.
+_TITLE_WEIGHT, _BODY_WEIGHT = 5.0, 1.0
+
+_state = {"fts": None}  # None until init_search() or the first check
+
+
+def fts_enabled() -> bool:
+    """Whether ``notes_fts`` exists.  Checked once per process when
+    ``init_search()`` has not run (``LOGGER_SCHEMA_CHECK = "off"``)."""
+    if _state["fts"] is None:
+        _state["fts"] = _fts_table_exists()
+    return _state["fts"]
+
+
+def _fts_table_exists() -> bool:
+    if db.engine.dialect.name != "sqlite":
+        return False
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'"
+            )).first() is not None
+    except Exception as exc:
+        log.warning("Could not check for the note search index: %s", exc)
+        return False
+
+
+def init_search():
+    """Create the FTS table/triggers if possible.  Call inside app context."""
+    _state["fts"] = False
+    if db.engine.dialect.name != "sqlite":
+        return
+    try:
+        with db.engine.begin() as conn:
+            existed = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'"
+            )).first() is not None
+            for ddl in _FTS_DDL:
+                conn.execute(text(ddl))
+            if not existed:
+                # Index notes written before the FTS table existed.
+                conn.execute(text(
+                    "INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')"
+                ))
+    except Exception as exc:
+        log.warning("FTS5 unavailable, note search falls back to LIKE: %s", exc)
+        return
+    _state["fts"] = True
+
+
+def rebuild_index() -> int:
+    """Rebuild ``notes_fts`` from ``notes``.  Returns the number of notes."""
+    with db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')"))
+        conn.execute(text("INSERT INTO notes_fts(notes_fts) VALUES ('optimize')"))
+        return conn.execute(text("SELECT count(*) FROM notes")).scalar()
+
+
+def _match_expr(query: str) -> str | None:
+    """Turn free text into a safe FTS5 expression (AND of quoted terms,
+    prefix match on the last one so results appear while typing)."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    terms = [f'"{t}"' for t in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight_html(marked: str) -> str:
+    return (
+        escape(marked)
+        .replace(_MARK_OPEN, "<mark>")
+        .replace(_MARK_CLOSE, "</mark>")
+    )
+
+
+def search_notes(user_id: int, query: str, limit: int = 20) -> list[dict]:
+    """Ranked notes for *user_id* matching *query*.
+
+    Each result is ``Note.to_dict()`` plus HTML-safe ``title_html`` and
+    ``snippet`` with matches wrapped in ``<mark>``.
+    """
+    expr = _match_expr(query)
+    if expr is None:
+        return []
+    if not fts_enabled():
+        return _search_like(user_id, query, limit)
+
+    rows = db.session.execute(
+        text(
+            """
+            SELECT notes_fts.rowid AS id,
+                   highlight(notes_fts, 0, :open, :close) AS title_hl,
+                   snippet(notes_fts, 1, :open, :close, '…', 16) AS snippet,
+                   bm25(notes_fts, :tw, :bw) AS rank
+            FROM notes_fts
+            JOIN notes ON notes.id = notes_fts.rowid
+            WHERE notes_fts MATCH :expr AND notes.user_id = :uid
+            ORDER BY rank
+            LIMIT :limit
+            """
+        ),
+        {
+            "open": _MARK_OPEN, "close": _MARK_CLOSE,
+            "tw": _TITLE_WEIGHT, "bw": _BODY_WEIGHT,
+            "expr": expr, "uid": user_id, "limit": limit,
+        },
+    ).all()
+    if not rows:
+        return []
+
+    notes = {
+        n.id: n
+        for n in Note.query.filter(Note.id.in_([r.id for r in rows]))
+    }
+    results = []
+    for r in rows:
+        note = notes.get(r.id)
+        if note is None:
+            continue
+        d = note.to_dict()
+        d["title_html"] = _highlight_html(r.title_hl or "")
+        d["snippet"] = _highlight_html(r.snippet or "")
+        d["rank"] = round(-r.rank, 4)
+        results.append(d)
+    return results
+
+
+def _search_like(user_id: int, query: str, limit: int) -> list[dict]:
+    q = Note.query.filter_by(user_id=user_id)
+    for token in _TOKEN_RE.findall(query):
+        pattern = f"%{token}%"
+        q = q.filter(db.or_(Note.title.ilike(pattern), Note.body.ilike(pattern)))
+    results = []
+    for note in q.order_by(Note.updated_at.desc()).limit(limit):
+        d = note.to_dict()
+        d["title_html"] = escape(note.title)
+        d["snippet"] = escape(note.body[:160])
+        d["rank"] = 0.0
+        results.append(d)
+    return results
+
+
+def register_cli(app):
+    """Add ``flask logger-rebuild-search`` to the host app."""
+    from . import ensure_schema
+
+    @app.cli.command("logger-rebuild-search")
+    def _rebuild_search_command():
+        """Rebuild the journal full-text search index."""
+        ensure_schema(app)
+        if not fts_enabled():
+            click.echo("FTS5 is not available on this database; nothing to rebuild.")
+            return
+        count = rebuild_index()
+        click.echo(f"Rebuilt note search index ({count} notes).")
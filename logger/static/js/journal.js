@@ -5,14 +5,103 @@
 const API = (window.LOGGER_API_BASE || "/api/items").replace(/items\/?$/, "notes");
 
 let notes = window.__NOTES__ || [];
+let nextCursor = window.__NOTES_NEXT__ || null;
+let syncToken = window.__NOTES_SYNC__ || null;
 let editingId = null;
+const CACHE_KEY = window.__NOTES_CACHE_KEY__ || null;
 
 document.addEventListener("DOMContentLoaded", () => {
   renderNotes();
   bindComposer();
   buildModal();
+  bindSearch();
+  if (!restoreCache()) loadRemaining();
+  document.addEventListener("visibilitychange", () => {
+    if (document.visibilityState === "visible") syncDelta();
+  });
 });
 
+/* ── Paging + delta sync ───────────────────────────────── */
+
+// Notes from the last visit plus a delta since then, so a returning
+// visitor does not page through the whole note set again.
+function restoreCache() {
+  if (!CACHE_KEY || !nextCursor) return false;
+  let cached = null;
+  try { cached = JSON.parse(localStorage.getItem(CACHE_KEY)); } catch (e) { /* corrupt */ }
+  if (!cached || !cached.token || !Array.isArray(cached.notes)) return false;
+  const fresh = new Set(notes.map((n) => n.id));
+  notes = notes.concat(cached.notes.filter((n) => !fresh.has(n.id)));
+  nextCursor = null;
+  syncToken = cached.token;
+  sortNotes();
+  renderNotes();
+  syncDelta();
+  return true;
+}
+
+// Only a complete note set is cached, with the token it is current to.
+function saveCache() {
+  if (!CACHE_KEY || nextCursor || !syncToken) return;
+  try {
+    localStorage.setItem(CACHE_KEY, JSON.stringify({ token: syncToken, notes }));
+  } catch (e) {
+    localStorage.removeItem(CACHE_KEY);  // over quota: fall back to paging
+  }
+}
+
+// Fetch pages after the server-rendered first page, following X-Next-Cursor.
+async function loadRemaining() {
+  while (nextCursor) {
+    try {
+      const res = await fetch(`${API}?cursor=${encodeURIComponent(nextCursor)}&limit=200`);
+      if (!res.ok) throw new Error("page fetch failed");
+      const page = await res.json();
+      const known = new Set(notes.map((n) => n.id));
+      notes.push(...page.filter((n) => !known.has(n.id)));
+      nextCursor = res.headers.get("X-Next-Cursor");
+    } catch (e) {
+      console.error(e);
+      return;
+    }
+  }
+  renderNotes();
+}
+
+// Pull only notes changed/deleted since the last sync token.
+async function syncDelta() {
+  if (!syncToken) return;
+  try {
+    const res = await fetch(`${API}?since=${encodeURIComponent(syncToken)}`);
+    if (res.status === 410) {
+      // Token older than the server remembers deletions: start over.
+      if (CACHE_KEY) localStorage.removeItem(CACHE_KEY);
+      location.reload();
+      return;
+    }
+    if (!res.ok) throw new Error("sync failed");
+    const delta = await res.json();
+    const gone = new Set(delta.deleted);
+    const changed = new Map(delta.changed.map((n) => [n.id, n]));
+    notes = notes.filter((n) => !gone.has(n.id) && !changed.has(n.id));
+    notes.push(...changed.values());
+    syncToken = res.headers.get("X-Sync-Token") || syncToken;
+    if (gone.size || changed.size) {
+      sortNotes();
+      renderNotes();
+    } else {
+      saveCache();
+    }
+  } catch (e) { console.error(e); }
+}
+
+function sortNotes() {
+  notes.sort((a, b) =>
+    (b.pinned - a.pinned) ||
+    (b.updated_at > a.updated_at ? 1 : b.updated_at < a.updated_at ? -1 : 0) ||
+    (b.id - a.id));
+}
+
 /* ── Render ────────────────────────────────────────────── */
 
 function renderNotes() {
@@ -31,6 +120,7 @@ function renderNotes() {
   pinnedSec.style.display = pinned.length ? "" : "none";
   othersSec.style.display = others.length ? "" : "none";
   empty.style.display = notes.length ? "none" : "";
+  saveCache();
 
   // Re-bind events
   document.querySelectorAll(".note-card").forEach((el) => {
@@ -82,6 +172,59 @@ function esc(s) {
   return d.innerHTML;
 }
 
+/* ── Search ────────────────────────────────────────────── */
+
+function bindSearch() {
+  const input = document.getElementById("note-search");
+  let timer = null;
+  let seq = 0;
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    timer = setTimeout(async () => {
+      const q = input.value.trim();
+      const mine = ++seq;
+      if (!q) { showSearch(null); return; }
+      try {
+        const res = await fetch(`${API}/search?q=${encodeURIComponent(q)}`);
+        if (!res.ok) throw new Error("search failed");
+        const results = await res.json();
+        if (mine === seq) showSearch(results);
+      } catch (e) { console.error(e); }
+    }, 150);
+  });
+}
+
+// results === null restores the normal pinned/others view.
+function showSearch(results) {
+  const searchSec = document.getElementById("search-section");
+  const sections = ["pinned-section", "others-section", "journal-empty", "note-composer"]
+    .map((id) => document.getElementById(id));
+  if (results === null) {
+    searchSec.style.display = "none";
+    document.getElementById("note-composer").style.display = "";
+    renderNotes();
+    return;
+  }
+  sections.forEach((el) => { el.style.display = "none"; });
+  searchSec.style.display = "";
+  const grid = document.getElementById("search-grid");
+  grid.innerHTML = results.length
+    ? results.map(resultHTML).join("")
+    : `<p class="note-card-date">No matching notes.</p>`;
+  grid.querySelectorAll(".note-card").forEach((el) => {
+    el.addEventListener("click", () => openModal(parseInt(el.dataset.id)));
+  });
+}
+
+// title_html / snippet are escaped server-side; only <mark> is raw HTML.
+function resultHTML(r) {
+  return `
+    <div class="note-card" data-id="${r.id}" data-color="${r.color}">
+      ${r.title ? `<div class="note-card-title">${r.title_html}</div>` : ""}
+      ${r.snippet ? `<div class="note-card-body">${r.snippet}</div>` : ""}
+    </div>`;
+}
+
 /* ── Composer ──────────────────────────────────────────── */
 
 function bindComposer() {
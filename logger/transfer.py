@@ -0,0 +1,360 @@
+"""
+Streaming export and bulk import of a user's logger data.
+
+One record per row, in dependency order (items, then log entries, then
+notes), as NDJSON or CSV.  Items carry their original id as ``ref`` and log
+entries point at it with ``item_ref``, so an export can be imported into
+another database (or another user) and the links are rebuilt.
+
+Export streams rows with server-side batching (``yield_per``), so memory
+stays flat regardless of history size.  Import reads the same formats
+line by line and inserts in batched transactions through ``run_write``.
+
+HTTP:  ``GET /api/export?format=ndjson|csv``, ``POST /api/import``
+CLI:   ``flask logger-export USERNAME [-f csv] [-o FILE]``
+       ``flask logger-import USERNAME FILE [-f csv]``
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import insert, select
+
+from . import db
+from .models import Item, LogEntry, Note, User
+from .writes import run_write
+
+log = logging.getLogger(__name__)
+
+FORMATS = ("ndjson", "csv")
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+YIELD_PER = 1000
+IMPORT_BATCH = 500
+
+_ITEM_FIELDS = (
+    "name", "description", "frequency", "alpha", "decay_rate", "target",
+    "current_value", "streak", "created_at", "updated_at",
+)
+_LOG_FIELDS = ("amount", "logged_at")
+_NOTE_FIELDS = ("title", "body", "color", "pinned", "created_at", "updated_at")
+
+CSV_COLUMNS = ("type", "ref", "item_ref") + tuple(
+    dict.fromkeys(_ITEM_FIELDS + _LOG_FIELDS + _NOTE_FIELDS)
+)
+
+_FLOATS = {"frequency", "alpha", "decay_rate", "target", "current_value", "amount"}
+_INTS = {"ref", "item_ref", "streak"}
+_DATES = {"created_at", "updated_at", "logged_at"}
+
+
+# ─────────────────────────────────────────────────────────
+#  Export
+# ─────────────────────────────────────────────────────────
+
+def _stream(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=YIELD_PER))
+
+
+def iter_records(user_id: int):
+    """Yield plain-dict records for *user_id* in import order."""
+    items = _stream(
+        select(Item.id, *[getattr(Item, f) for f in _ITEM_FIELDS])
+        .where(Item.user_id == user_id)
+        .order_by(Item.id)
+    )
+    for row in items:
+        rec = {"type": "item", "ref": row.id}
+        rec.update({f: getattr(row, f) for f in _ITEM_FIELDS})
+        yield rec
+
+    logs = _stream(
+        select(LogEntry.item_id, LogEntry.amount, LogEntry.logged_at)
+        .join(Item, Item.id == LogEntry.item_id)
+        .where(Item.user_id == user_id)
+        .order_by(LogEntry.id)
+    )
+    for row in logs:
+        yield {
+            "type": "log", "item_ref": row.item_id,
+            "amount": row.amount, "logged_at": row.logged_at,
+        }
+
+    notes = _stream(
+        select(Note.id, *[getattr(Note, f) for f in _NOTE_FIELDS])
+        .where(Note.user_id == user_id)
+        .order_by(Note.id)
+    )
+    for row in notes:
+        rec = {"type": "note", "ref": row.id}
+        rec.update({f: getattr(row, f) for f in _NOTE_FIELDS})
+        yield rec
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_ndjson(records):
+    for rec in records:
+        yield json.dumps(
+            {k: _plain(v) for k, v in rec.items()}, ensure_ascii=False
+        ) + "\n"
+
+
+def iter_csv(records):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for n, rec in enumerate(records, 1):
+        writer.writerow({k: _plain(v) for k, v in rec.items()})
+        if n % 100 == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def export_chunks(user_id: int, fmt: str = "ndjson", stats: dict | None = None):
+    """Encoded export stream.  When *stats* is given it is filled with
+    ``records``, ``bytes`` and ``seconds`` once the stream is exhausted."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}.")
+    counter = {"records": 0}
+
+    def counted():
+        for rec in iter_records(user_id):
+            counter["records"] += 1
+            yield rec
+
+    encode = iter_ndjson if fmt == "ndjson" else iter_csv
+    start = time.perf_counter()
+    size = 0
+    for chunk in encode(counted()):
+        size += len(chunk.encode())
+        yield chunk
+    elapsed = time.perf_counter() - start
+    log.info(
+        "Exported %d records (%d bytes) for user %s in %.2fs (%.0f rec/s)",
+        counter["records"], size, user_id, elapsed,
+        counter["records"] / elapsed if elapsed else 0,
+    )
+    if stats is not None:
+        stats.update(records=counter["records"], bytes=size, seconds=elapsed)
+
+
+# ─────────────────────────────────────────────────────────
+#  Import
+# ─────────────────────────────────────────────────────────
+
+def _decoded(lines):
+    """Iterate *lines*, reporting undecodable input as ``ValueError``."""
+    # No line number: text streams decode ahead in chunks.
+    lines = iter(lines)
+    while True:
+        try:
+            line = next(lines)
+        except StopIteration:
+            return
+        except UnicodeDecodeError as exc:
+            raise ValueError("input is not valid UTF-8") from exc
+        yield line
+
+
+def _parse_ndjson(lines):
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"line {lineno}: invalid JSON ({exc.msg})") from exc
+        if not isinstance(rec, dict):
+            raise ValueError(f"line {lineno}: expected a JSON object")
+        yield lineno, rec
+
+
+def _parse_csv(lines):
+    reader = csv.DictReader(lines)
+    for rec in reader:
+        yield reader.line_num, {k: v for k, v in rec.items() if v not in ("", None)}
+
+
+def _coerce(lineno, rec, fields):
+    out = {}
+    for f in fields:
+        if f not in rec or rec[f] is None:
+            continue
+        value = rec[f]
+        try:
+            if f in _FLOATS:
+                value = float(value)
+            elif f in _INTS:
+                value = int(value)
+            elif f in _DATES:
+                value = datetime.fromisoformat(value)
+            elif f == "pinned":
+                value = value if isinstance(value, bool) else str(value).lower() in ("1", "true")
+            else:
+                value = str(value)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"line {lineno}: bad value for {f!r}") from exc
+        out[f] = value
+    return out
+
+
+class _Importer:
+    def __init__(self, user_id: int, batch_size: int):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.item_ids = {}  # export ref -> new Item.id
+        self.counts = {"item": 0, "log": 0, "note": 0}
+        self.kind = None
+        self.batch = []  # [(ref, values)]
+
+    def add(self, lineno, rec):
+        kind = rec.get("type")
+        if not isinstance(kind, str) or kind not in self.counts:
+            raise ValueError(f"line {lineno}: unknown record type {kind!r}")
+        if kind != self.kind or len(self.batch) >= self.batch_size:
+            self.flush()
+            self.kind = kind
+        if kind == "item":
+            values = _coerce(lineno, rec, _ITEM_FIELDS)
+            if "name" not in values:
+                raise ValueError(f"line {lineno}: item needs a name")
+            values["user_id"] = self.user_id
+            ref = _coerce(lineno, rec, ("ref",)).get("ref")
+        elif kind == "log":
+            values = _coerce(lineno, rec, _LOG_FIELDS)
+            ref = _coerce(lineno, rec, ("item_ref",)).get("item_ref")
+            if ref not in self.item_ids or "amount" not in values:
+                raise ValueError(f"line {lineno}: log needs amount and a known item_ref")
+            values["item_id"] = self.item_ids[ref]
+        else:
+            values = _coerce(lineno, rec, _NOTE_FIELDS)
+            values["user_id"] = self.user_id
+            ref = None
+        self.batch.append((ref, values))
+
+    def flush(self):
+        if not self.batch:
+            return
+        kind, batch = self.kind, self.batch
+        self.batch = []
+        model = {"item": Item, "log": LogEntry, "note": Note}[kind]
+        rows = [_with_defaults(model, values) for _, values in batch]
+
+        def unit():
+            if kind != "item":
+                db.session.execute(insert(model), rows)
+                return []
+            return list(db.session.scalars(
+                insert(Item).returning(Item.id, sort_by_parameter_order=True),
+                rows,
+            ))
+
+        new_ids = run_write(unit)
+        for (ref, _), new_id in zip(batch, new_ids):
+            if ref is not None:
+                self.item_ids[ref] = new_id
+        self.counts[kind] += len(batch)
+
+
+def _with_defaults(model, values):
+    """Give every row the full column set.
+
+    An executemany ``insert`` is compiled from the first row's keys, so
+    rows omitting a column another row sets would fail; apply the column
+    defaults here instead."""
+    row = {}
+    for col in model.__table__.columns:
+        if col.key in values:
+            row[col.key] = values[col.key]
+        elif col.default is not None and not col.primary_key:
+            arg = col.default.arg
+            row[col.key] = arg(None) if callable(arg) else arg
+    return row
+
+
+def import_records(user_id: int, lines, fmt: str = "ndjson",
+                   batch_size: int = IMPORT_BATCH) -> dict:
+    """Import an export stream (iterable of text lines) for *user_id*.
+
+    Each batch commits on its own; on a bad record a ``ValueError`` naming
+    the line is raised and batches before it stay imported.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {FORMATS}.")
+    parse = _parse_ndjson if fmt == "ndjson" else _parse_csv
+    importer = _Importer(user_id, batch_size)
+    start = time.perf_counter()
+    for lineno, rec in parse(_decoded(lines)):
+        importer.add(lineno, rec)
+    importer.flush()
+    elapsed = time.perf_counter() - start
+    total = sum(importer.counts.values())
+    result = {
+        "imported": importer.counts,
+        "records": total,
+        "seconds": round(elapsed, 3),
+        "records_per_sec": round(total / elapsed) if elapsed else total,
+    }
+    log.info("Imported %s for user %s", result, user_id)
+    return result
+
+
+# ─────────────────────────────────────────────────────────
+#  CLI
+# ─────────────────────────────────────────────────────────
+
+def _user_id(username):
+    user_id = db.session.scalar(select(User.id).where(User.username == username))
+    if user_id is None:
+        raise click.ClickException(f"No such user: {username}")
+    return user_id
+
+
+def register_cli(app):
+    """Add ``flask logger-export`` / ``flask logger-import`` to the host app."""
+    from . import ensure_schema
+
+    @app.cli.command("logger-export")
+    @click.argument("username")
+    @click.option("-f", "--format", "fmt", type=click.Choice(FORMATS), default="ndjson")
+    @click.option("-o", "--output", type=click.File("w", encoding="utf-8"), default="-")
+    def _export_command(username, fmt, output):
+        """Stream USERNAME's items, logs and notes to a file (or stdout)."""
+        ensure_schema(app)
+        stats = {}
+        for chunk in export_chunks(_user_id(username), fmt, stats):
+            output.write(chunk)
+        click.echo(
+            f"Exported {stats['records']} records ({stats['bytes']} bytes) "
+            f"in {stats['seconds']:.2f}s "
+            f"({stats['records'] / stats['seconds'] if stats['seconds'] else 0:.0f} rec/s)",
+            err=True,
+        )
+
+    @app.cli.command("logger-import")
+    @click.argument("username")
+    @click.argument("source", type=click.File("r", encoding="utf-8"))
+    @click.option("-f", "--format", "fmt", type=click.Choice(FORMATS), default="ndjson")
+    @click.option("--batch-size", type=int, default=IMPORT_BATCH, show_default=True)
+    def _import_command(username, source, fmt, batch_size):
+        """Bulk-import an export file into USERNAME's account."""
+        ensure_schema(app)
+        try:
+            result = import_records(_user_id(username), source, fmt, batch_size)
+        except ValueError as exc:
+            raise click.ClickException(str(exc))
+        click.echo(
+            f"Imported {result['records']} records {result['imported']} "
+            f"in {result['seconds']:.2f}s ({result['records_per_sec']} rec/s)",
+            err=True,
+        )
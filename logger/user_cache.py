@@ -0,0 +1,132 @@
+"""
+Per-process TTL + LRU cache of authenticated-user principals.
+
+Flask-Login calls the user loader on every request that touches
+``current_user`` (including the blueprint-wide login check), which would
+otherwise be one ``SELECT`` from ``users`` per request.  The cache keeps a
+small, session-independent ``UserPrincipal`` per user id instead.
+
+Entries are evicted when the ``User`` row is updated or deleted in this
+process (ORM events); other workers pick up the change once the TTL
+expires.  Counters are available from ``stats()``.
+
+Config keys (defaults set in ``init_app``)::
+
+    LOGGER_USER_CACHE_TTL   60    seconds; 0 disables the cache
+    LOGGER_USER_CACHE_SIZE  1024  max principals kept per process
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from . import db
+
+
+class UserPrincipal(UserMixin):
+    """Read-only stand-in for ``User`` carrying what requests need."""
+
+    __slots__ = ("id", "username")
+
+    def __init__(self, id: int, username: str):
+        self.id = id
+        self.username = username
+
+    def __repr__(self):
+        return f"<UserPrincipal {self.id} {self.username!r}>"
+
+
+class UserCache:
+    def __init__(self, ttl: float = 60.0, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # user_id -> (expires_at, principal)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, user_id: int, load):
+        """Return the principal for *user_id*, calling ``load(user_id)`` on a
+        miss.  ``load`` returns a principal or ``None`` (not cached)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        principal = load(user_id)
+        if principal is not None and self.ttl > 0:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return principal
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+cache = UserCache()
+
+
+def configure(app):
+    app.config.setdefault("LOGGER_USER_CACHE_TTL", 60)
+    app.config.setdefault("LOGGER_USER_CACHE_SIZE", 1024)
+    cache.ttl = float(app.config["LOGGER_USER_CACHE_TTL"])
+    cache.maxsize = int(app.config["LOGGER_USER_CACHE_SIZE"])
+    cache.clear()
+
+
+def _load_principal(user_id: int):
+    from .models import User
+
+    row = db.session.execute(
+        db.select(User.id, User.username).where(User.id == user_id)
+    ).first()
+    return UserPrincipal(row.id, row.username) if row else None
+
+
+def load_user(user_id: int):
+    return cache.get(user_id, _load_principal)
+
+
+def stats() -> dict:
+    return cache.stats()
+
+
+def _register_invalidation():
+    from .models import User
+
+    @event.listens_for(User, "after_update")
+    @event.listens_for(User, "after_delete")
+    def _evict(_mapper, _conn, target):
+        cache.invalidate(target.id)
+
+
+_register_invalidation()
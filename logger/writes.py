@@ -0,0 +1,252 @@
+"""
+SQLite write path for multi-worker deployments.
+
+Several gunicorn workers share one ``logger.db``.  With SQLite's defaults
+(rollback journal, deferred transactions) every commit locks readers out
+too, and writers queue on pysqlite's implicit 5 s busy timeout, failing
+with "database is locked" only once a wait outlasts it.  This module
+provides:
+
+* an engine profile applied on every new connection – WAL journal,
+  configurable ``synchronous`` level and ``busy_timeout`` – plus explicit
+  ``BEGIN`` handling so write transactions start ``IMMEDIATE``: they take
+  the write lock up front (waiting via busy_timeout) instead of failing
+  with SQLITE_BUSY on a read→write upgrade.  Other transactions stay
+  DEFERRED, so reads never queue behind writers;
+* ``run_write(fn)`` – runs a small unit of work in its own write
+  transaction, retrying busy/locked errors with jittered backoff;
+* an optional in-process ``WriteQueue`` (``LOGGER_WRITE_QUEUE = True``)
+  whose writer thread groups concurrently submitted units into a single
+  transaction, one SAVEPOINT per unit, so N small commits cost one.
+
+Config keys (defaults set in ``init_app``)::
+
+    LOGGER_SQLITE_TUNING          True     apply the profile below
+    LOGGER_SQLITE_JOURNAL_MODE    "WAL"
+    LOGGER_SQLITE_SYNCHRONOUS     "NORMAL"
+    LOGGER_SQLITE_BUSY_TIMEOUT_MS 5000
+    LOGGER_WRITE_RETRIES          5
+    LOGGER_WRITE_QUEUE            False
+"""
+
+import logging
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+
+from . import db
+
+log = logging.getLogger(__name__)
+
+# "IMMEDIATE" while a write unit is opening its transaction.
+_begin_mode = ContextVar("logger_sqlite_begin_mode", default="")
+
+_RETRY_BASE_DELAY = 0.01  # seconds, doubled per attempt
+_RETRY_MAX_DELAY = 0.5
+
+
+def set_defaults(app):
+    app.config.setdefault("LOGGER_SQLITE_TUNING", True)
+    app.config.setdefault("LOGGER_SQLITE_JOURNAL_MODE", "WAL")
+    app.config.setdefault("LOGGER_SQLITE_SYNCHRONOUS", "NORMAL")
+    app.config.setdefault("LOGGER_SQLITE_BUSY_TIMEOUT_MS", 5000)
+    app.config.setdefault("LOGGER_WRITE_RETRIES", 5)
+    app.config.setdefault("LOGGER_WRITE_QUEUE", False)
+
+
+def configure_engine(app):
+    """Attach the SQLite profile to the app's engine.  Needs app context."""
+    engine = db.engine
+    if engine.dialect.name != "sqlite" or not app.config["LOGGER_SQLITE_TUNING"]:
+        return
+
+    journal_mode = app.config["LOGGER_SQLITE_JOURNAL_MODE"]
+    synchronous = app.config["LOGGER_SQLITE_SYNCHRONOUS"]
+    busy_timeout = int(app.config["LOGGER_SQLITE_BUSY_TIMEOUT_MS"])
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        # Take transaction control away from pysqlite so that SAVEPOINTs
+        # nest properly and we choose DEFERRED vs IMMEDIATE ourselves.
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        cur.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+        cur.execute(f"PRAGMA journal_mode = {journal_mode}")
+        cur.execute(f"PRAGMA synchronous = {synchronous}")
+        cur.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(conn):
+        conn.exec_driver_sql(f"BEGIN {_begin_mode.get()}".strip())
+
+    # Connections opened before the listeners existed lack the profile.
+    engine.dispose()
+
+
+def is_busy_error(exc: Exception) -> bool:
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def _backoff(attempt: int):
+    delay = min(_RETRY_BASE_DELAY * (2 ** attempt), _RETRY_MAX_DELAY)
+    time.sleep(delay * (0.5 + random.random()))
+
+
+def _transaction(fn, retries: int):
+    """Run *fn* and commit in one IMMEDIATE transaction, retrying on busy."""
+    for attempt in range(retries + 1):
+        # End any read transaction the request already opened so the
+        # next statement starts a fresh BEGIN IMMEDIATE.
+        db.session.rollback()
+        token = _begin_mode.set("IMMEDIATE")
+        try:
+            result = fn()
+            db.session.commit()
+            return result
+        except OperationalError as exc:
+            db.session.rollback()
+            if not is_busy_error(exc) or attempt == retries:
+                raise
+            log.info("SQLite busy, retrying write (attempt %d)", attempt + 1)
+            _backoff(attempt)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            _begin_mode.reset(token)
+
+
+def commit_opportunistic() -> bool:
+    """Commit bookkeeping writes made while serving a read (e.g. decay).
+
+    Under contention the commit is dropped instead of failing the page;
+    the same writes are recomputed by a later request.  Returns whether
+    the commit happened – on False the session has been rolled back.
+    """
+    try:
+        db.session.commit()
+        return True
+    except OperationalError as exc:
+        db.session.rollback()
+        if not is_busy_error(exc):
+            raise
+        log.info("SQLite busy, skipped opportunistic commit")
+        return False
+
+
+def run_write(fn):
+    """Execute write unit *fn* (no arguments, uses ``db.session``) and return
+    its result once committed.
+
+    *fn* may be re-run on retry, so it should load what it modifies rather
+    than rely on ORM objects fetched outside of it.  With the write queue
+    enabled the unit runs on the queue's writer thread, batched with others.
+    """
+    app = current_app._get_current_object()
+    if app.config["LOGGER_WRITE_QUEUE"]:
+        # Drop this request's read snapshot before handing off.
+        db.session.rollback()
+        return _get_queue(app).submit(fn)
+    return _transaction(fn, app.config["LOGGER_WRITE_RETRIES"])
+
+
+# ─────────────────────────────────────────────────────────
+#  Coalescing write queue
+# ─────────────────────────────────────────────────────────
+
+class _Pending:
+    __slots__ = ("fn", "done", "result", "error")
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class WriteQueue:
+    """Single writer thread that commits queued units in batches.
+
+    Units submitted while a batch is committing are picked up together by
+    the next one (up to ``max_batch``).  Each unit runs inside a SAVEPOINT,
+    so one failing unit only rolls back itself.
+    """
+
+    def __init__(self, app, max_batch=64):
+        self.app = app
+        self.max_batch = max_batch
+        self.retries = app.config["LOGGER_WRITE_RETRIES"]
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="logger-write-queue", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, fn):
+        pending = _Pending(fn)
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        def run_all():
+            # Take the write lock up front: a busy BEGIN IMMEDIATE must
+            # reach _transaction() and be retried, not fail the first unit.
+            db.session.connection()
+            for p in batch:
+                p.result, p.error = None, None
+                try:
+                    with db.session.begin_nested():
+                        p.result = p.fn()
+                except OperationalError as exc:
+                    if is_busy_error(exc):
+                        raise  # retry the whole batch with backoff
+                    p.error = exc
+                except Exception as exc:
+                    p.error = exc
+
+        try:
+            _transaction(run_all, self.retries)
+        except Exception as exc:
+            log.exception("Write batch of %d failed", len(batch))
+            for p in batch:
+                p.error = p.error or exc
+        finally:
+            db.session.remove()
+            for p in batch:
+                p.done.set()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def _get_queue(app) -> WriteQueue:
+    # Started lazily so a pre-forking server never forks a live thread.
+    wq = _queues.get(app)
+    if wq is None:
+        with _queues_lock:
+            wq = _queues.get(app)
+            if wq is None:
+                wq = _queues[app] = WriteQueue(app)
+    return wq
@@ -0,0 +1,343 @@
+"""
+Request and SQL instrumentation, exposed in Prometheus text format.
+
+``init_app(app)`` installs request hooks that record, per endpoint, a
+latency histogram, response sizes and status counts, plus SQLAlchemy
+cursor hooks that count queries and query time for the current request.
+``timer(call)`` measures outbound work (GitHub fetch, Docker stitch).
+Everything is served at ``GET /metrics``.
+
+Metrics are per process: under gunicorn each worker keeps its own
+registry, so scrape every worker (or add the ``pid`` label on the
+scrape side) rather than the load-balanced port.
+
+Config keys (defaults set in ``init_app``)::
+
+    METRICS_ENABLED          True  install the hooks and /metrics
+    METRICS_TOKEN            ""    if set, /metrics requires "Bearer <token>";
+                                   if unset, it only answers direct
+                                   loopback requests (no X-Forwarded-For)
+    METRICS_SLOW_REQUEST_MS  0     log requests slower than this with their
+                                   query breakdown; 0 disables the log
+
+Call ``init_app`` before ``Compress(app)`` so recorded sizes are the
+compressed ones (after-request hooks run in reverse order).
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 180)
+_LOOPBACK = ("127.0.0.1", "::1")
+
+_SLOW_LOG_STATEMENTS = 5
+
+
+# ─────────────────────────────────────────────────────────
+#  Registry
+# ─────────────────────────────────────────────────────────
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{v}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _num(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def render(self):
+        yield f"# HELP {self.name} {self.doc}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            items = sorted(self._values.items())
+            items = [(k, self._copy(v)) for k, v in items]
+        for key, value in items:
+            yield from self._render_one(key, value)
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def _render_one(self, key, value):
+        yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = value
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def dec(self, *labelvalues, amount=1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def _render_one(self, key, value):
+        yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            entry = self._values.get(labelvalues)
+            if entry is None:
+                entry = self._values[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @staticmethod
+    def _copy(value):
+        return (list(value[0]), value[1], value[2])
+
+    def _render_one(self, key, value):
+        counts, total, count = value
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            le = (("le", _num(bound)),)
+            yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}"
+        inf = (("le", "+Inf"),)
+        yield f"{self.name}_bucket{_labels(self.labelnames, key, inf)} {count}"
+        yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+        yield f"{self.name}_count{_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.add(Counter(
+    "http_requests_total", "Requests handled, by endpoint, method and status.",
+    ("endpoint", "method", "status"),
+))
+LATENCY = registry.add(Histogram(
+    "http_request_duration_seconds", "Time to build the response.",
+    ("endpoint", "method"), LATENCY_BUCKETS,
+))
+RESPONSE_SIZE = registry.add(Histogram(
+    "http_response_size_bytes", "Response body size (after compression).",
+    ("endpoint",), SIZE_BUCKETS,
+))
+QUERIES = registry.add(Histogram(
+    "db_queries_per_request", "SQL statements executed per request.",
+    ("endpoint",), QUERY_BUCKETS,
+))
+QUERY_TIME = registry.add(Histogram(
+    "db_query_duration_seconds_per_request", "Total SQL time per request.",
+    ("endpoint",), LATENCY_BUCKETS,
+))
+BACKGROUND_QUERIES = registry.add(Counter(
+    "db_background_queries_total",
+    "SQL statements executed outside a request (write queue, CLI).",
+))
+EXTERNAL = registry.add(Histogram(
+    "external_call_duration_seconds", "Outbound work such as GitHub and Docker.",
+    ("call", "outcome"), EXTERNAL_BUCKETS,
+))
+_START_TIME = time.time()
+
+
+@contextmanager
+def timer(call: str):
+    """Time the ``with`` body as ``external_call_duration_seconds{call=...}``;
+    the outcome label is ``error`` if it raises."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL.observe(time.perf_counter() - start, call, outcome)
+
+
+# ─────────────────────────────────────────────────────────
+#  SQL hooks
+# ─────────────────────────────────────────────────────────
+
+_WS = re.compile(r"\s+")
+
+
+def _shorten(statement: str) -> str:
+    return _WS.sub(" ", statement).strip()[:120]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = g.get("_metrics_sql") if has_request_context() else None
+    if stats is None:
+        BACKGROUND_QUERIES.inc()
+        return
+    stats["count"] += 1
+    stats["seconds"] += elapsed
+    if stats["statements"] is not None:
+        key = _shorten(statement)
+        n, t = stats["statements"].get(key, (0, 0.0))
+        stats["statements"][key] = (n + 1, t + elapsed)
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("metrics_query_start") if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def _install_sql_hooks():
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+
+# ─────────────────────────────────────────────────────────
+#  Flask integration
+# ─────────────────────────────────────────────────────────
+
+def _render_process() -> str:
+    return (
+        "# HELP process_start_time_seconds Start time of this worker.\n"
+        "# TYPE process_start_time_seconds gauge\n"
+        f'process_start_time_seconds{{pid="{os.getpid()}"}} {_START_TIME}\n'
+    )
+
+
+def _is_local_request() -> bool:
+    return (
+        request.remote_addr in _LOOPBACK
+        and "X-Forwarded-For" not in request.headers
+    )
+
+
+def init_app(app):
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_TOKEN", "")
+    app.config.setdefault("METRICS_SLOW_REQUEST_MS", 0)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    slow_ms = float(app.config["METRICS_SLOW_REQUEST_MS"])
+    _install_sql_hooks()
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        g._metrics_sql = {
+            "count": 0, "seconds": 0.0,
+            # Per-statement breakdown is only kept when it can be logged.
+            "statements": {} if slow_ms else None,
+        }
+
+    @app.after_request
+    def _metrics_record(response):
+        start = g.pop("_metrics_start", None)
+        sql = g.pop("_metrics_sql", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        REQUESTS.inc(endpoint, request.method, response.status_code)
+        LATENCY.observe(elapsed, endpoint, request.method)
+        # Streamed bodies (exports) are not measured: that would buffer them.
+        size = response.content_length
+        if size is None and response.is_sequence:
+            size = response.calculate_content_length()
+        if size is not None:
+            RESPONSE_SIZE.observe(size, endpoint)
+        QUERIES.observe(sql["count"], endpoint)
+        QUERY_TIME.observe(sql["seconds"], endpoint)
+        if slow_ms and elapsed * 1000 >= slow_ms:
+            top = sorted(sql["statements"].items(), key=lambda kv: -kv[1][1])
+            breakdown = "; ".join(
+                f"{n}x {t * 1000:.1f}ms {stmt}" for stmt, (n, t) in top[:_SLOW_LOG_STATEMENTS]
+            )
+            log.warning(
+                "Slow request %s %s (%s) %.0fms, %d queries in %.0fms: %s",
+                request.method, request.path, endpoint, elapsed * 1000,
+                sql["count"], sql["seconds"] * 1000, breakdown or "-",
+            )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        token = app.config["METRICS_TOKEN"]
+        if token:
+            if request.headers.get("Authorization") != f"Bearer {token}":
+                abort(401)
+        elif not _is_local_request():
+            # A reverse proxy on the same host connects from loopback too.
+            abort(403)
+        return Response(
+            registry.render() + _render_process(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
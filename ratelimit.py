@@ -0,0 +1,167 @@
+"""
+Rate-limit counters shared by every worker on the host, kept in SQLite.
+
+Flask-Limiter's default in-memory storage counts per process, so with N
+gunicorn workers every limit is effectively N times higher.  Importing
+this module registers a ``sqlite://`` storage scheme with ``limits`` (the
+library behind Flask-Limiter); point ``RATELIMIT_STORAGE_URI`` at a file
+all workers can reach, ideally on tmpfs::
+
+    RATELIMIT_STORAGE_URI = "sqlite:////dev/shm/capsule-ratelimit.db"
+    RATELIMIT_STRATEGY = "sliding-window-counter"
+
+Supports the ``fixed-window`` and ``sliding-window-counter`` strategies.
+Every check is a single short ``BEGIN IMMEDIATE`` transaction on a WAL
+database with ``synchronous=OFF`` (counters are disposable, so durability
+is not needed), which keeps the read-decide-increment step atomic across
+processes.  Expired counters are purged every ``_PURGE_EVERY`` writes.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ratelimit_counters (
+    key        TEXT PRIMARY KEY,
+    value      INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+_INCR = """
+INSERT INTO ratelimit_counters (key, value, expires_at) VALUES (?1, ?2, ?3)
+ON CONFLICT(key) DO UPDATE SET
+    value = CASE WHEN expires_at <= ?4 THEN excluded.value ELSE value + excluded.value END,
+    expires_at = CASE WHEN expires_at <= ?4 THEN excluded.expires_at ELSE expires_at END
+RETURNING value
+"""
+
+_PURGE_EVERY = 1000
+_BUSY_TIMEOUT_MS = 5000
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """``limits`` storage backed by one SQLite file, safe across processes."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options):
+        path = uri.split("://", 1)[1][1:] if "://" in uri else ""
+        if not path or path == ":memory:":
+            raise ValueError("sqlite rate-limit storage needs a file path, "
+                             "e.g. sqlite:////dev/shm/ratelimit.db")
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connect().execute(_SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection must not be shared with a forked child.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _maybe_purge(self, conn, now):
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            conn.execute("DELETE FROM ratelimit_counters WHERE expires_at <= ?", (now,))
+
+    # ─── Storage ──────────────────────────────────────────────────────
+    def incr(self, key: str, expiry: float, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._connect()
+        (value,) = conn.execute(_INCR, (key, amount, now + expiry, now)).fetchone()
+        self._maybe_purge(conn, now)
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connect().execute(
+            "SELECT value FROM ratelimit_counters WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._connect().execute(
+            "SELECT expires_at FROM ratelimit_counters WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._connect().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> int | None:
+        return self._connect().execute("DELETE FROM ratelimit_counters").rowcount
+
+    def clear(self, key: str) -> None:
+        self._connect().execute("DELETE FROM ratelimit_counters WHERE key = ?", (key,))
+
+    # ─── Sliding window counter ───────────────────────────────────────
+    def _window(self, conn, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        counts = dict(conn.execute(
+            "SELECT key, value FROM ratelimit_counters "
+            "WHERE key IN (?, ?) AND expires_at > ?",
+            (previous_key, current_key, now),
+        ).fetchall())
+        previous = counts.get(previous_key, 0)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, previous, previous_ttl, counts.get(current_key, 0), current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int,
+                                     amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current_key, previous, previous_ttl, current, _ = self._window(
+                conn, key, expiry, now
+            )
+            if floor(previous * previous_ttl / expiry + current) + amount > limit:
+                conn.execute("COMMIT")
+                return False
+            # Keep the window for two periods; the next one weighs it.
+            conn.execute(_INCR, (current_key, amount, now + 2 * expiry, now)).fetchone()
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._maybe_purge(conn, now)
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> tuple[int, float, int, float]:
+        _, previous, previous_ttl, current, current_ttl = self._window(
+            self._connect(), key, expiry, time.time()
+        )
+        return previous, previous_ttl, current, current_ttl
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)